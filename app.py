@@ -2,7 +2,14 @@ from flask import Flask, request, render_template_string
 import os
 import json
 from x_ray_feature import run_xray_with_json
-import requests
+from db_engine import get_engine, pool_stats
+from dataset_cache import dataset_cache
+from prebuild import dataset_table_name, prebuild_dashboards
+from jobs import job_manager
+import threading
+from superset_client import get_superset_client
+from guest_tokens import GuestTokenCache
+from state_store import init_state
 
 app = Flask(__name__)
 
@@ -29,86 +36,103 @@ USERNAME = "admin"
 PASSWORD = "admin"
 GUEST_TOKEN_ENDPOINT = f"{SUPERSET_BASE_URL}/api/v1/security/guest_token/"
 
-def find_json_file(user_query):
+def find_keyword(user_query):
     user_query = user_query.lower()
-    for keyword, file_path in data_files.items():
+    for keyword in data_files:
         if keyword in user_query:
-            return file_path
+            return keyword
+    return None
+
+def find_json_file(user_query):
+    keyword = find_keyword(user_query)
+    return data_files[keyword] if keyword else None
+
+# Dashboards built ahead of time by prebuild_all(), keyed by data_files keyword
+prebuilt_dashboards = {}
+
+def prebuild_all():
+    reports = prebuild_dashboards(data_files, DB_CONNECTION_STRING, TABLE_NAME, DASHBOARD_TITLE, DATABASE_ID, SCHEMA)
+    for report in reports:
+        if report["status"] == "built":
+            prebuilt_dashboards[report["keyword"]] = {
+                "embed_url": report["embed_url"],
+                "mtime": os.path.getmtime(report["file_path"]),
+            }
+
+def find_prebuilt_embed_url(keyword):
+    prebuilt = prebuilt_dashboards.get(keyword)
+    if prebuilt and os.path.getmtime(data_files[keyword]) == prebuilt["mtime"]:
+        return prebuilt["embed_url"]
     return None
 
 def authenticate():
-    login_data = {
-        "username": USERNAME,
-        "password": PASSWORD,
-        "provider": "db",
-        "refresh": True
-    }
-    response = requests.post(f"{SUPERSET_BASE_URL}/api/v1/security/login", json=login_data)
-    if response.status_code == 200:
-        access_token = response.json().get("access_token")
-        headers = {"Authorization": f"Bearer {access_token}"}
-
-        csrf_response = requests.get(f"{SUPERSET_BASE_URL}/api/v1/security/csrf_token/", headers=headers)
-        if csrf_response.status_code == 200:
-            csrf_token = csrf_response.json().get("result")
-            headers["X-CSRFToken"] = csrf_token
-            headers["Content-Type"] = "application/json"
-            return headers
-    raise Exception("Authentication failed")
-
-def generate_guest_token(dashboard_id):
-    headers = authenticate()
-    guest_token_payload = {
-        "resources": [{"type": "dashboard", "id": dashboard_id}],
-        "user": {"username": "embed_user"},
-        "rls": []
-    }
-    response = requests.post(GUEST_TOKEN_ENDPOINT, headers=headers, json=guest_token_payload)
-    if response.status_code == 200:
-        return response.json().get("token")
-    else:
-        raise Exception(f"Failed to generate guest token {response.json()}")
+    """
+    Shared Superset client (pooled session, cached access/CSRF tokens).
+    """
+    client = get_superset_client(SUPERSET_BASE_URL, USERNAME, PASSWORD)
+    client.headers()
+    return client
+
+# Guest tokens per (dashboard, RLS rules), renewed in the background while dashboards are viewed
+guest_token_cache = GuestTokenCache(authenticate)
 
-progress = {"value": 0}
+def generate_guest_token(dashboard_id, rls=None):
+    return guest_token_cache.get(dashboard_id, rls)
 
-@app.route('/progress', methods=['GET'])
-def get_progress():
-    global progress
-    return progress, 200
+@app.route('/superset_stats', methods=['GET'])
+def get_superset_stats():
+    return get_superset_client(SUPERSET_BASE_URL, USERNAME, PASSWORD).stats(), 200
 
-def update_progress(value):
-    """Update the global progress."""
-    global progress
-    progress["value"] = value
+@app.route('/guest_token_stats', methods=['GET'])
+def get_guest_token_stats():
+    return guest_token_cache.stats(), 200
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return {"error": "Unknown job"}, 404
+    return job.to_dict(), 200
+
+@app.route('/pool_stats', methods=['GET'])
+def get_pool_stats():
+    return pool_stats(), 200
+
+@app.route('/dataset_cache_stats', methods=['GET'])
+def get_dataset_cache_stats():
+    return dataset_cache.stats(), 200
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     response_message = ""
     embed_url = ""
+    job_id = ""
     
     if request.method == 'POST':
         query = request.form.get('query', '').lower()
-        json_file = find_json_file(query)
+        keyword = find_keyword(query)
+        json_file = data_files[keyword] if keyword else None
 
         if json_file and os.path.exists(json_file):
-            # Load the JSON file and pass it to the xray script
-            with open(json_file, 'r') as file:
-                json_file = json.load(file)
-            try:
-                # Run x-ray feature to load data and create the dashboard
-                embed_url = run_xray_with_json(
+            embed_url = find_prebuilt_embed_url(keyword)
+            if embed_url:
+                response_message = f"Dashboard created successfully for '{query}'."
+            else:
+                # Build in the background; the page polls /jobs/<job_id> for stage progress.
+                # The path is passed so the xray script can stream the file instead of loading it whole.
+                job = job_manager.submit(
+                    keyword,
+                    run_xray_with_json,
                     file_path=json_file,
                     db_connection_string=DB_CONNECTION_STRING,
-                    table_name=TABLE_NAME,
-                    dataset_name=DATASET_NAME,
-                    dashboard_title=DASHBOARD_TITLE,
+                    table_name=dataset_table_name(TABLE_NAME, keyword),
+                    dataset_name=dataset_table_name(DATASET_NAME, keyword),
+                    dashboard_title=f"{DASHBOARD_TITLE} - {keyword}",
                     database_id=DATABASE_ID,
                     schema=SCHEMA
                 )
-                
-                response_message = f"Dashboard created successfully for '{query}'."
-            except Exception as e:
-                response_message = f"Error creating dashboard: {str(e)}"
+                job_id = job.id
+                response_message = f"Building dashboard for '{query}'..."
         else:
             response_message = "No matching data file found for your query."
 
@@ -253,31 +277,65 @@ def index():
             }
             </style>
             <script>
+                const jobId = {{ job_id|tojson }};
+                const query = {{ query|tojson }};
+
                 document.addEventListener("DOMContentLoaded", function() {
                     const overlay = document.getElementById('loading-overlay');
                     overlay.style.display = 'none';
+                    if (jobId) {
+                        showLoading();
+                        pollJob();
+                    }
                 });
 
-                let progress = 0;
-                let loadingInterval;
-
-                function startLoading() {
-                    const bar = document.querySelector('.loading-bar');
-                    loadingInterval = setInterval(() => {
-                        progress += Math.random() * 10; // Simulate random progress
-                        if (progress >= 100) {
-                            progress = 100;
-                            clearInterval(loadingInterval);
-                        }
-                        bar.style.width = progress + '%';
-                    }, 1500); // Update every 200ms
+                function pollJob() {
+                    fetch('/jobs/' + jobId)
+                        .then(response => response.json())
+                        .then(job => {
+                            document.querySelector('.loading-bar').style.width = (job.progress || 0) + '%';
+                            document.getElementById('loading-stage').textContent = job.stage || '';
+                            if (job.status === 'done' || job.status === 'failed' || job.error) {
+                                document.getElementById('loading-overlay').style.display = 'none';
+                                const message = document.querySelector('.response-message');
+                                if (job.status === 'done' && job.result) {
+                                    message.textContent = "Dashboard created successfully for '" + query + "'.";
+                                    showEmbed(job.result);
+                                } else {
+                                    message.textContent = 'Error creating dashboard: ' + (job.error || 'no dashboard was created');
+                                }
+                                return;
+                            }
+                            setTimeout(pollJob, 1000);
+                        })
+                        .catch(() => setTimeout(pollJob, 2000));
+                }
+
+                function showEmbed(embedUrl) {
+                    const container = document.createElement('div');
+                    container.className = 'embed-container';
+                    const iframe = document.createElement('iframe');
+                    iframe.id = 'dashboard-iframe';
+                    iframe.src = embedUrl + '&standalone=1';
+                    iframe.width = '100%';
+                    iframe.height = '100%';
+                    iframe.frameBorder = '0';
+                    iframe.style.border = '0';
+                    container.appendChild(iframe);
+                    const button = document.createElement('button');
+                    button.className = 'fullscreen-btn';
+                    button.textContent = 'Full Screen';
+                    button.onclick = goFullScreen;
+                    const slot = document.getElementById('embed-slot');
+                    slot.appendChild(container);
+                    slot.appendChild(button);
                 }
 
                 function showLoading() {
                     const overlay = document.getElementById('loading-overlay');
                     overlay.style.display = 'flex';
-                    progress = 0; // Reset progress
-                    startLoading();
+                    document.querySelector('.loading-bar').style.width = '0%';
+                    document.getElementById('loading-stage').textContent = '';
                 }
 
                 function goFullScreen() {
@@ -325,6 +383,7 @@ def index():
                 <div class="loading-bar-container">
                     <div class="loading-bar"></div>
                 </div>
+                <div id="loading-stage" style="font-size: 0.6em; margin-top: 10px;"></div>
             </div>
             <div class="container">
                 <h1 style="display: flex; align-items: center; justify-content: center;">
@@ -352,11 +411,18 @@ def index():
                     </div>
                     <button class="fullscreen-btn" onclick="goFullScreen()">Full Screen</button>
                 {% endif %}
+                <div id="embed-slot"></div>
             </div>
         </body>
         </html>
-    ''', response_message=response_message, embed_url=embed_url)
+    ''', response_message=response_message, embed_url=embed_url, job_id=job_id,
+       query=request.form.get('query', '') if request.method == 'POST' else '')
 
 
 if __name__ == '__main__':
+    init_state()
+    # Create and warm up the pooled engine before the first request arrives
+    get_engine(DB_CONNECTION_STRING)
+    if os.environ.get("XRAY_PREBUILD") == "1":
+        threading.Thread(target=prebuild_all, daemon=True).start()
     app.run(debug=True, host='0.0.0.0', port=5050)
@@ -3,6 +3,8 @@ import os
 import json
 from x_ray_feature import run_xray_with_json
 import requests
+from superset_client import get_superset_client
+from state_store import init_state
 
 app = Flask(__name__)
 
@@ -42,24 +44,7 @@ def authenticate():
     """
     Authenticate with Superset and retrieve headers with authorization and CSRF tokens.
     """
-    login_data = {
-        "username": USERNAME,
-        "password": PASSWORD,
-        "provider": "db",
-        "refresh": True
-    }
-    response = requests.post(f"{SUPERSET_BASE_URL}/api/v1/security/login", json=login_data)
-    if response.status_code == 200:
-        access_token = response.json().get("access_token")
-        headers = {"Authorization": f"Bearer {access_token}"}
-
-        csrf_response = requests.get(f"{SUPERSET_BASE_URL}/api/v1/security/csrf_token/", headers=headers)
-        if csrf_response.status_code == 200:
-            csrf_token = csrf_response.json().get("result")
-            headers["X-CSRFToken"] = csrf_token
-            headers["Content-Type"] = "application/json"
-            return headers
-    raise Exception("Authentication failed")
+    return get_superset_client(SUPERSET_BASE_URL, USERNAME, PASSWORD).headers()
 
 def generate_guest_token(dashboard_id):
     """
@@ -218,4 +203,5 @@ def index():
     ''', response_message=response_message, embed_url=embed_url)
 
 if __name__ == '__main__':
+    init_state()
     app.run(debug=True)
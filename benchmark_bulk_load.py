@@ -0,0 +1,57 @@
+"""
+Rows/sec benchmark of the dialect bulk loader against the pandas to_sql path.
+
+Usage: python benchmark_bulk_load.py [rows] [db_connection_string]
+Defaults to 200000 rows in a temporary SQLite file.
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from bulk_load import bulk_load_dataframe, get_bulk_loader, load_to_sql
+from db_engine import get_engine
+from x_ray_feature import create_table_if_not_exists
+
+
+def make_frame(rows):
+    rng = np.random.default_rng(0)
+    names = np.array(["Alice", "Bob", "Charlie", "Dave", "Eve"], dtype=object)
+    return pd.DataFrame({
+        "Reviewer": names[rng.integers(0, len(names), rows)],
+        "Reviewee": names[rng.integers(0, len(names), rows)],
+        "ReviewDate": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+        "Comments": np.char.add("comment ", rng.integers(0, 1000, rows).astype(str)).astype(object),
+        "LinesChanged": rng.integers(1, 500, rows),
+        "Score": rng.random(rows),
+    })
+
+
+def time_loader(name, loader, df, engine, table_name):
+    create_table_if_not_exists(df, engine, table_name)
+    start = time.perf_counter()
+    loader(df, engine, table_name)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {elapsed:8.2f}s  {len(df) / elapsed:12,.0f} rows/sec")
+    return elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    if len(sys.argv) > 2:
+        db_connection_string = sys.argv[2]
+    else:
+        db_connection_string = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    engine = get_engine(db_connection_string)
+    df = make_frame(rows)
+    print(f"Loading {rows} rows into {engine.dialect.name}")
+
+    baseline = time_loader("to_sql (chunksize=1000)", load_to_sql, df, engine, "bench_to_sql")
+    bulk = time_loader(f"bulk ({get_bulk_loader(engine).__name__})", bulk_load_dataframe, df, engine, "bench_bulk")
+    print(f"Speedup: {baseline / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
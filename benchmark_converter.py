@@ -0,0 +1,87 @@
+"""
+Benchmark of the schema-compiled columnar converter against the previous
+object-DataFrame + astype + pd.to_datetime path.
+
+Usage: python benchmark_converter.py [rows]
+Defaults to a 5,000,000-row synthetic dataset file.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from columnar import CompiledConverter
+
+SCHEMA = [
+    {"idx": 0, "colName": "Reviewer", "dataType": "string"},
+    {"idx": 1, "colName": "Reviewee", "dataType": "string"},
+    {"idx": 2, "colName": "ReviewDate", "dataType": "date"},
+    {"idx": 3, "colName": "Comments", "dataType": "string"},
+    {"idx": 4, "colName": "LinesChanged", "dataType": "int"},
+    {"idx": 5, "colName": "HoursSpent", "dataType": "double"},
+]
+
+
+def legacy_rows_to_dataframe(rows, schema):
+    columns = [col['colName'] for col in schema]
+    data_types = {col['colName']: col['dataType'] for col in schema}
+    dtype_mapping = {"string": str, "double": float, "int": int, "date": "datetime64[ns]"}
+    df = pd.DataFrame(rows, columns=columns)
+    for column, dtype in data_types.items():
+        if dtype == "date":
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+        else:
+            df[column] = df[column].astype(dtype_mapping[dtype])
+    return df
+
+
+def write_synthetic_file(path, rows):
+    rng = np.random.default_rng(0)
+    names = ["Alice", "Bob", "Charlie", "Dave", "Eve"]
+    dates = pd.date_range("2020-01-01", periods=1500).strftime("%Y-%m-%d").tolist()
+    with open(path, "w") as file:
+        file.write('{"name": "Synthetic", "schema": ' + json.dumps(SCHEMA) + ', "data": [\n')
+        for start in range(0, rows, 100000):
+            count = min(100000, rows - start)
+            who = rng.integers(0, len(names), (count, 2))
+            day = rng.integers(0, len(dates), count)
+            lines = rng.integers(1, 500, count)
+            hours = rng.random(count) * 40
+            chunk = ",\n".join(
+                json.dumps([names[a], names[b], dates[d], f"comment {n}", int(n), float(h)])
+                for (a, b), d, n, h in zip(who, day, lines, hours)
+            )
+            file.write(("," if start else "") + chunk)
+        file.write("\n]}")
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {elapsed:8.2f}s")
+    return result, elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    path = os.path.join(tempfile.mkdtemp(), "synthetic.json")
+    print(f"Writing {rows} synthetic rows to {path}")
+    write_synthetic_file(path, rows)
+
+    with open(path) as file:
+        data = json.load(file)["data"]
+
+    legacy, legacy_time = timed("legacy (DataFrame + astype)", legacy_rows_to_dataframe, data, SCHEMA)
+    _, serial_time = timed("compiled converter (1 worker)", CompiledConverter(SCHEMA, workers=1), data)
+    compiled, compiled_time = timed("compiled converter (parallel)", CompiledConverter(SCHEMA), data)
+
+    pd.testing.assert_frame_equal(legacy, compiled, check_dtype=False)
+    print(f"Speedup: {legacy_time / min(serial_time, compiled_time):.1f}x")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
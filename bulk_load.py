@@ -0,0 +1,159 @@
+import csv
+import os
+import tempfile
+import pandas as pd
+import sqlalchemy
+from sqlalchemy import text
+
+# Rows per INSERT statement / executemany batch for the generic loader
+INSERT_BATCH_ROWS = 1000
+
+# pymysql refuses LOAD DATA LOCAL INFILE unless the connection is opened with this flag
+MYSQL_CONNECT_ARGS = {"local_infile": True}
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def _dataframe_to_rows(df, datetime_format=None):
+    """
+    Convert a DataFrame into a list of tuples holding plain Python values (None for nulls),
+    which every DBAPI driver can bind without knowing about NumPy types.
+    Datetimes become datetime objects, or strings when a datetime_format is given.
+    """
+    columns = []
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            if datetime_format:
+                values = series.dt.strftime(datetime_format).tolist()
+            else:
+                values = list(series.dt.to_pydatetime())
+        else:
+            values = series.tolist()
+        if series.hasnans:
+            mask = series.isna().tolist()
+            values = [None if is_null else value for value, is_null in zip(values, mask)]
+        columns.append(values)
+    return list(zip(*columns))
+
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def load_mysql_infile(df, engine, table_name):
+    """
+    Write the DataFrame to a temporary CSV file and load it with LOAD DATA LOCAL INFILE.
+    """
+    csv_df = df.copy()
+    for column in csv_df.columns:
+        if pd.api.types.is_object_dtype(csv_df[column]):
+            # The default ESCAPED BY '\\' would otherwise swallow backslashes in the data
+            csv_df[column] = csv_df[column].str.replace("\\", "\\\\", regex=False)
+
+    fd, csv_path = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as csv_file:
+            csv_df.to_csv(csv_file, index=False, header=False, na_rep="\\N",
+                          date_format="%Y-%m-%d %H:%M:%S", quoting=csv.QUOTE_MINIMAL,
+                          lineterminator="\n")
+
+        column_list = ", ".join(_quote(engine, col) for col in df.columns)
+        load_sql = (
+            f"LOAD DATA LOCAL INFILE '{csv_path.replace(os.sep, '/')}' "
+            f"INTO TABLE {_quote(engine, table_name)} CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+            "LINES TERMINATED BY '\\n' "
+            f"({column_list})"
+        )
+        with engine.begin() as conn:
+            conn.execute(text(load_sql))
+    finally:
+        os.remove(csv_path)
+    return len(df)
+
+
+def load_sqlite_executemany(df, engine, table_name):
+    """
+    Insert through the raw sqlite3 connection with executemany inside one transaction.
+    """
+    placeholders = ", ".join("?" for _ in df.columns)
+    column_list = ", ".join(_quote(engine, col) for col in df.columns)
+    insert_sql = f"INSERT INTO {_quote(engine, table_name)} ({column_list}) VALUES ({placeholders})"
+
+    rows = _dataframe_to_rows(df, datetime_format=DATETIME_FORMAT)
+    raw_conn = engine.raw_connection()
+    try:
+        cursor = raw_conn.cursor()
+        cursor.executemany(insert_sql, rows)
+        cursor.close()
+        raw_conn.commit()
+    finally:
+        raw_conn.close()
+    return len(rows)
+
+
+def load_multirow_values(df, engine, table_name):
+    """
+    Insert with multi-row INSERT ... VALUES statements, or executemany on dialects without them.
+    """
+    table = sqlalchemy.Table(table_name, sqlalchemy.MetaData(), autoload_with=engine)
+    columns = list(df.columns)
+    rows = _dataframe_to_rows(df)
+
+    with engine.begin() as conn:
+        for start in range(0, len(rows), INSERT_BATCH_ROWS):
+            batch = [dict(zip(columns, row)) for row in rows[start:start + INSERT_BATCH_ROWS]]
+            if engine.dialect.supports_multivalues_insert:
+                conn.execute(table.insert().values(batch))
+            else:
+                conn.execute(table.insert(), batch)
+    return len(rows)
+
+
+def load_to_sql(df, engine, table_name):
+    """
+    The plain pandas path, kept for comparison and as the last-resort fallback.
+    """
+    df.to_sql(table_name, con=engine, if_exists='append', index=False, chunksize=INSERT_BATCH_ROWS)
+    return len(df)
+
+
+BULK_LOADERS = {
+    "mysql": load_mysql_infile,
+    "sqlite": load_sqlite_executemany,
+}
+
+
+def get_bulk_loader(engine):
+    """
+    Pick the fastest loader available for the engine's dialect.
+    """
+    return BULK_LOADERS.get(engine.dialect.name, load_multirow_values)
+
+
+def engine_connect_args(db_connection_string):
+    """
+    Extra connect_args the bulk loader needs for this connection string.
+    """
+    backend = sqlalchemy.engine.make_url(db_connection_string).get_backend_name()
+    if backend == "mysql":
+        return dict(MYSQL_CONNECT_ARGS)
+    return {}
+
+
+def bulk_load_dataframe(df, engine, table_name):
+    """
+    Append the DataFrame to an existing table with the dialect's bulk loader.
+    Falls back to multi-row VALUES if the native path is refused (e.g. local_infile disabled).
+    """
+    if df.empty:
+        return 0
+    loader = get_bulk_loader(engine)
+    try:
+        return loader(df, engine, table_name)
+    except sqlalchemy.exc.DBAPIError as e:
+        if loader is load_multirow_values:
+            raise
+        print(f"Bulk loader '{loader.__name__}' failed ({e.orig}), falling back to multi-row VALUES.")
+        return load_multirow_values(df, engine, table_name)
@@ -0,0 +1,180 @@
+"""
+Asyncio chart creation with an adaptive (AIMD) concurrency limit.
+
+Every chart is a POST /api/v1/chart/ sent through the shared SupersetClient on a worker thread.
+The number of requests in flight starts low, grows by about one per round trip while Superset
+answers quickly, and is halved when it answers slowly, with 429/5xx or not at all. A chart is
+retried with backoff only when Superset cannot have created it (429, 503, connect timeout), so a
+slow or failed response never leaves a duplicate chart behind.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from superset_client import CHART_CONCURRENCY, POST_RETRY_STATUSES, RETRY_STATUSES, backoff_delay
+
+CHART_ENDPOINT = "/api/v1/chart/"
+
+CHART_MIN_CONCURRENCY = int(os.environ.get("XRAY_CHART_MIN_CONCURRENCY", 1))
+# Never more than the client's connection pool, so requests do not queue for a socket
+CHART_MAX_CONCURRENCY = int(os.environ.get("XRAY_CHART_MAX_CONCURRENCY", CHART_CONCURRENCY))
+CHART_INITIAL_CONCURRENCY = int(os.environ.get("XRAY_CHART_INITIAL_CONCURRENCY", 4))
+# Responses slower than this count as congestion
+CHART_LATENCY_TARGET = float(os.environ.get("XRAY_CHART_LATENCY_TARGET", 2.0))
+CHART_REQUEST_TIMEOUT = float(os.environ.get("XRAY_CHART_REQUEST_TIMEOUT", 30))
+CHART_MAX_ATTEMPTS = int(os.environ.get("XRAY_CHART_MAX_ATTEMPTS", 4))
+CHART_BACKOFF_BASE = 0.5
+CHART_BACKOFF_MAX = 10.0
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase / multiplicative-decrease limit on concurrent requests.
+    A decrease only applies to requests started after the previous decrease, so one burst of
+    errors halves the limit once instead of once per failed request.
+    """
+
+    def __init__(self, initial=CHART_INITIAL_CONCURRENCY, minimum=CHART_MIN_CONCURRENCY,
+                 maximum=CHART_MAX_CONCURRENCY, latency_target=CHART_LATENCY_TARGET):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.peak = self.limit
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        """
+        Wait for a free slot; returns the start time to hand back to release().
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+            return time.monotonic()
+
+    async def release(self, started_at, congested):
+        async with self._condition:
+            self.in_flight -= 1
+            if congested:
+                if started_at >= self._last_decrease:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self._last_decrease = time.monotonic()
+                    self.decreases += 1
+            elif self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self.peak = max(self.peak, self.limit)
+                self.increases += 1
+            self._condition.notify_all()
+
+    def stats(self):
+        return {
+            "limit": round(self.limit, 2),
+            "peak": round(self.peak, 2),
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
+
+
+def retry_delay(attempt, response=None):
+    """
+    Seconds to wait before the next attempt (Retry-After or jittered exponential backoff).
+    """
+    return backoff_delay(attempt, response, CHART_BACKOFF_BASE, CHART_BACKOFF_MAX)
+
+
+async def _create_one(loop, executor, limiter, client, payload, visualization):
+    result = {
+        "description": visualization.get("description"),
+        "viz_type": visualization.get("type"),
+        "chart_id": None,
+        "status": "failed",
+        "status_code": None,
+        "attempts": 0,
+        "latency": None,
+        "error": None,
+    }
+    for attempt in range(CHART_MAX_ATTEMPTS):
+        result["attempts"] = attempt + 1
+        started_at = await limiter.acquire()
+        response = None
+        congested = False
+        retryable = False
+        try:
+            response = await loop.run_in_executor(
+                # The limiter has to see every 429/5xx, so the client must not retry on its own
+                executor, lambda: client.post(CHART_ENDPOINT, json=payload, timeout=CHART_REQUEST_TIMEOUT, retries=0)
+            )
+            result["status_code"] = response.status_code
+            congested = response.status_code in RETRY_STATUSES
+            retryable = response.status_code in POST_RETRY_STATUSES
+        except requests.RequestException as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            congested = True
+            retryable = isinstance(e, requests.ConnectTimeout)
+        except Exception as e:
+            # e.g. a failed re-login or an open circuit: this chart fails, the others keep their ids
+            result["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            latency = time.monotonic() - started_at
+            result["latency"] = round(latency, 3)
+            await limiter.release(started_at, congested or latency > limiter.latency_target)
+
+        if response is not None and response.status_code == 201:
+            result.update(status="created", chart_id=response.json().get("id"), error=None)
+            return result
+        if response is not None:
+            result["error"] = f"HTTP {response.status_code}" if retryable else response.text[:500]
+        if not retryable:
+            return result
+        if attempt + 1 < CHART_MAX_ATTEMPTS:
+            await asyncio.sleep(retry_delay(attempt, response))
+    return result
+
+
+async def create_charts_async(client, payloads, visualizations, on_result=None, limiter=None):
+    """
+    Create every chart concurrently under an adaptive limit. Returns one result dict per
+    visualization, in input order. on_result(result, done, total) runs as each chart finishes.
+    """
+    loop = asyncio.get_running_loop()
+    limiter = limiter or AdaptiveLimiter()
+    total = len(payloads)
+    done = 0
+
+    async def run(payload, visualization):
+        nonlocal done
+        result = await _create_one(loop, executor, limiter, client, payload, visualization)
+        done += 1
+        if on_result:
+            on_result(result, done, total)
+        return result
+
+    with ThreadPoolExecutor(max_workers=limiter.maximum, thread_name_prefix="xray-chart") as executor:
+        return await asyncio.gather(*(run(p, v) for p, v in zip(payloads, visualizations)))
+
+
+def create_charts(client, payloads, visualizations, on_result=None):
+    """
+    Synchronous entry point: run the chart pipeline on its own event loop and return a summary
+    with the per-chart results, the elapsed time and the limiter's final state.
+    """
+    start = time.perf_counter()
+    limiter_box = {}
+
+    async def main():
+        limiter_box["limiter"] = AdaptiveLimiter()
+        return await create_charts_async(client, payloads, visualizations, on_result, limiter_box["limiter"])
+
+    results = asyncio.run(main())
+    return {
+        "results": results,
+        "created": sum(r["status"] == "created" for r in results),
+        "failed": sum(r["status"] != "created" for r in results),
+        "seconds": round(time.perf_counter() - start, 3),
+        "concurrency": limiter_box["limiter"].stats(),
+    }
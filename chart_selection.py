@@ -0,0 +1,148 @@
+"""
+Ranked, budgeted chart selection.
+
+plan_visualizations proposes every chart the column kinds allow, which on a wide table is far
+more than anyone reads, and every chart is one more query each time the dashboard renders.
+Each candidate is scored for informativeness (0 to 1) and query cost from the column profile
+alone, and the best ones are kept within a chart budget and a query cost budget.
+
+Cost is counted in full-table aggregations: the table chart only reads row_limit rows, a box
+plot computes quantiles, and a chart grouped by a column gets dearer with its cardinality.
+"""
+import math
+import os
+
+CHART_BUDGET = int(os.environ.get("XRAY_CHART_BUDGET", 16))
+QUERY_COST_BUDGET = float(os.environ.get("XRAY_QUERY_COST_BUDGET", 20))
+# Categorical columns with up to this many values read well as pie slices or bars...
+CATEGORY_SWEET_SPOT = 12
+# ...and those with more distinct values than this share of their non-null rows are free text or ids
+FREE_TEXT_UNIQUE_RATIO = 0.5
+
+VIZ_BASE_COST = {"table": 0.1, "box_plot": 1.5}
+# Discount for charts that repeat a view another candidate already gives (box plot vs histogram,
+# area vs line) or that only make sense next to others (bubble)
+VIZ_WEIGHT = {"box_plot": 0.7, "bubble": 0.8, "bar": 0.9, "area": 0.6}
+# Each further chart of a type is worth this much less than the previous one, so a wide table gets
+# a mix of chart types rather than one histogram per column
+VIZ_REPEAT_DECAY = 0.85
+
+
+def _present(column):
+    return 1 - column["null_ratio"]
+
+
+def numeric_score(column):
+    """
+    Constant columns say nothing; a handful of distinct values makes a poor distribution.
+    """
+    if not column["std"] or column["cardinality"] < 2:
+        return 0.0
+    return _present(column) * min(1.0, math.log(column["cardinality"]) / math.log(CATEGORY_SWEET_SPOT))
+
+
+def category_score(column, rows):
+    """
+    Best with 2 to CATEGORY_SWEET_SPOT values, worse the more there are, zero for free text.
+    """
+    cardinality = column["cardinality"]
+    if cardinality < 2:
+        return 0.0
+    if cardinality > CATEGORY_SWEET_SPOT and cardinality > FREE_TEXT_UNIQUE_RATIO * rows * _present(column):
+        return 0.0
+    return _present(column) * min(1.0, CATEGORY_SWEET_SPOT / cardinality)
+
+
+def time_score(column):
+    return _present(column) if column["cardinality"] >= 2 else 0.0
+
+
+def chart_score(visualization, columns, rows):
+    viz_type = visualization.get("type")
+    if viz_type == "table":
+        score = 1.0
+    elif viz_type in ("histogram", "box_plot"):
+        score = numeric_score(columns[visualization["all_columns_x"]])
+    elif viz_type == "bubble":
+        score = min(numeric_score(columns[visualization["x_axis"]]), numeric_score(columns[visualization["y_axis"]]))
+        score *= category_score(columns[visualization["entity"]], rows)
+    elif viz_type == "bar":
+        score = numeric_score(columns[visualization["metric"]["column"]["column_name"]])
+        score *= category_score(columns[visualization["groupby"]], rows)
+    elif viz_type == "pie":
+        score = category_score(columns[visualization["groupby"]], rows)
+    elif viz_type in ("line", "area"):
+        score = time_score(columns[visualization["time_column"]])
+    else:
+        score = 0.5
+    return score * VIZ_WEIGHT.get(viz_type, 1.0)
+
+
+def chart_cost(visualization, columns):
+    groupby = visualization.get("entity") or visualization.get("groupby")
+    groups = columns[groupby]["cardinality"] if groupby in columns else 1
+    return VIZ_BASE_COST.get(visualization.get("type"), 1.0) * (1 + math.log10(max(groups, 1)) / 4)
+
+
+def select_visualizations(visualizations, profile, max_charts=CHART_BUDGET, max_cost=QUERY_COST_BUDGET):
+    """
+    Keep the highest scoring candidates while both budgets allow, in their original plan order.
+    Returns {"visualizations", "pruned": [{description, viz_type, score, cost, reason}], "cost",
+    "budget"}.
+    """
+    rows = profile["rows"]
+    columns = {column["name"]: column for column in profile["columns"]}
+    candidates = [
+        {
+            "index": index,
+            "visualization": visualization,
+            "score": chart_score(visualization, columns, rows),
+            "cost": round(chart_cost(visualization, columns), 3),
+        }
+        for index, visualization in enumerate(visualizations)
+    ]
+    repeats = {}
+    for candidate in sorted(candidates, key=lambda c: (-c["score"], c["index"])):
+        viz_type = candidate["visualization"].get("type")
+        candidate["score"] = round(candidate["score"] * VIZ_REPEAT_DECAY ** repeats.get(viz_type, 0), 3)
+        repeats[viz_type] = repeats.get(viz_type, 0) + 1
+
+    selected = []
+    pruned = []
+    spent = 0.0
+    for candidate in sorted(candidates, key=lambda c: (-c["score"], c["cost"], c["index"])):
+        if candidate["score"] <= 0:
+            reason = "uninformative"
+        elif len(selected) >= max_charts:
+            reason = "chart budget"
+        elif spent + candidate["cost"] > max_cost:
+            reason = "query cost budget"
+        else:
+            selected.append(candidate)
+            spent += candidate["cost"]
+            continue
+        pruned.append({
+            "description": candidate["visualization"].get("description"),
+            "viz_type": candidate["visualization"].get("type"),
+            "score": candidate["score"],
+            "cost": candidate["cost"],
+            "reason": reason,
+        })
+
+    selected.sort(key=lambda c: c["index"])
+    return {
+        "visualizations": [candidate["visualization"] for candidate in selected],
+        "pruned": pruned,
+        "cost": round(spent, 3),
+        "budget": {"charts": max_charts, "cost": max_cost},
+    }
+
+
+def print_selection(selection):
+    kept = len(selection["visualizations"])
+    print(f"Selected {kept} of {kept + len(selection['pruned'])} candidate charts "
+          f"(query cost {selection['cost']}/{selection['budget']['cost']}, "
+          f"chart budget {selection['budget']['charts']})")
+    for candidate in selection["pruned"]:
+        print(f"  pruned ({candidate['reason']}, score {candidate['score']}, cost {candidate['cost']}): "
+              f"{candidate['description']}")
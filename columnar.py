@@ -0,0 +1,154 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Candidate formats tried, in order, when inferring a date column's format
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%SZ",
+    "%Y/%m/%d",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%d-%m-%Y",
+]
+# Formats pandas can parse with its fast ISO 8601 path instead of strptime
+ISO_DATE_FORMATS = {
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%SZ",
+}
+DATE_SAMPLE_SIZE = 100
+CONVERTER_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def infer_date_format(values, sample_size=DATE_SAMPLE_SIZE):
+    """
+    Return the first DATE_FORMATS entry that parses every sampled non-null string, or None.
+    """
+    sample = []
+    for value in values:
+        if isinstance(value, str) and value:
+            sample.append(value)
+            if len(sample) >= sample_size:
+                break
+    if not sample:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            for value in sample:
+                datetime.strptime(value, date_format)
+            return date_format
+        except ValueError:
+            continue
+    return None
+
+
+def _to_string(values):
+    array = np.ascontiguousarray(values)
+    if all(type(value) is str for value in array):
+        return array
+    # Same result as astype(str): None becomes 'None', numbers become their repr
+    return array.astype(str).astype(object)
+
+
+def _transpose(rows, width):
+    """
+    Turn row lists into one object array per column without building a DataFrame.
+    """
+    matrix = np.array(rows, dtype=object)
+    if matrix.ndim != 2 or matrix.shape[1] < width:
+        # Ragged or nested rows: let pandas pad them with None
+        matrix = pd.DataFrame(rows).to_numpy(dtype=object)
+    return matrix
+
+
+def _parse_dates(values, date_format):
+    if date_format in ISO_DATE_FORMATS:
+        date_format = "ISO8601"
+    parsed = pd.to_datetime(values, format=date_format, errors='coerce')
+    return np.array(parsed, dtype="datetime64[ns]")
+
+
+class CompiledConverter:
+    """
+    Turns row lists into a typed DataFrame for one schema block.
+
+    Rows are transposed once and each column goes straight into a typed NumPy buffer, instead of
+    building an object DataFrame and casting it column by column. Date formats are inferred from
+    the first chunk a column is seen in and reused for every later chunk, so a converter belongs
+    to one dataset stream: another file with the same schema may write its dates differently.
+    """
+
+    def __init__(self, schema, workers=CONVERTER_WORKERS):
+        self.schema = sorted(schema, key=lambda col: col.get('idx', 0))
+        self.columns = [col['colName'] for col in self.schema]
+        self.workers = workers
+        self.date_formats = {}
+
+    def _convert_column(self, col, values):
+        name, dtype = col['colName'], col['dataType']
+        if dtype == "double":
+            return np.array(values, dtype=np.float64)
+        if dtype == "int":
+            return np.array(values, dtype=np.int64)
+        if dtype == "date":
+            date_format = self.date_formats.get(name)
+            if date_format is None:
+                # Unknown formats fall back to pandas' own per-call inference
+                date_format = infer_date_format(values)
+                if date_format:
+                    self.date_formats[name] = date_format
+            parsed = _parse_dates(values, date_format)
+            if date_format:
+                self._reparse_unmatched(name, values, parsed, date_format)
+            return parsed
+        return _to_string(values)
+
+    def _reparse_unmatched(self, name, values, parsed, date_format):
+        """
+        Dates that did not match the column's format (NaT for a non-empty string) are parsed
+        again with a format inferred from them, which then replaces the column's format.
+        """
+        failed = np.flatnonzero(np.isnat(parsed))
+        failed = failed[[isinstance(values[i], str) and bool(values[i]) for i in failed]]
+        if not len(failed):
+            return
+        retry_format = infer_date_format(values[failed])
+        if retry_format is None or retry_format == date_format:
+            print(f"Column '{name}': {len(failed)} values do not match '{date_format}' and are stored as null.")
+            return
+        print(f"Column '{name}': {len(failed)} values do not match '{date_format}'; "
+              f"parsing them as '{retry_format}'.")
+        self.date_formats[name] = retry_format
+        parsed[failed] = _parse_dates(values[failed], retry_format)
+
+    def __call__(self, rows):
+        if rows:
+            width = max(col.get('idx', position) for position, col in enumerate(self.schema)) + 1
+            matrix = _transpose(rows, width)
+            column_values = [matrix[:, col.get('idx', position)] for position, col in enumerate(self.schema)]
+        else:
+            column_values = [np.empty(0, dtype=object) for _ in self.schema]
+
+        if self.workers > 1 and len(self.schema) > 1 and rows:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(self.schema))) as executor:
+                arrays = list(executor.map(self._convert_column, self.schema, column_values))
+        else:
+            arrays = [self._convert_column(col, values) for col, values in zip(self.schema, column_values)]
+        return pd.DataFrame(dict(zip(self.columns, arrays)), columns=self.columns, copy=False)
+
+
+def compile_converter(schema):
+    """
+    Return a new converter for a schema block. Use one per dataset stream (see CompiledConverter).
+    """
+    return CompiledConverter(schema)
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import time
+from state_store import get_state_connection
+
+
+def init_registry():
+    conn = get_state_connection()
+    columns = [row["name"] for row in conn.execute('PRAGMA table_info(dashboard_registry)')]
+    if columns and "profile_bucket" not in columns:
+        # Entries keyed by schema alone: drop them, their dashboards are rebuilt on the next request
+        conn.execute('DROP TABLE dashboard_registry')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS dashboard_registry (
+            base_url TEXT NOT NULL,
+            database_id INTEGER NOT NULL,
+            schema_name TEXT NOT NULL,
+            dataset_name TEXT NOT NULL,
+            schema_fingerprint TEXT NOT NULL,
+            profile_bucket TEXT NOT NULL,
+            plan_version INTEGER NOT NULL,
+            dataset_id INTEGER NOT NULL,
+            dashboard_id INTEGER NOT NULL,
+            chart_ids TEXT NOT NULL,
+            embed_uuid TEXT,
+            created_at REAL NOT NULL,
+            used_at REAL NOT NULL,
+            PRIMARY KEY (base_url, database_id, schema_name, dataset_name, schema_fingerprint, profile_bucket,
+                         plan_version)
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def schema_fingerprint(profile):
+    """
+    Hash of the column names and dtypes (from a profiler.py profile) in order; which charts are
+    planned depends on nothing else, which of them are selected also on coarse column statistics
+    (see plan_cache.profile_bucket).
+    """
+    columns = [[str(column["name"]), column["dtype"]] for column in profile["columns"]]
+    return hashlib.sha256(json.dumps(columns).encode("utf-8")).hexdigest()
+
+
+def _key(base_url, database_id, schema, dataset_name, fingerprint, bucket, plan_version):
+    return (base_url, database_id, schema or "", dataset_name, fingerprint, bucket, plan_version)
+
+
+def find_dashboard(base_url, database_id, schema, dataset_name, fingerprint, bucket, plan_version):
+    """
+    The dashboard previously built for this dataset, schema, profile bucket (plan_cache.bucket_key,
+    which decides the chart selection) and plan version, or None.
+    """
+    conn = get_state_connection()
+    row = conn.execute(
+        'SELECT * FROM dashboard_registry WHERE base_url = ? AND database_id = ? AND schema_name = ? '
+        'AND dataset_name = ? AND schema_fingerprint = ? AND profile_bucket = ? AND plan_version = ?',
+        _key(base_url, database_id, schema, dataset_name, fingerprint, bucket, plan_version)
+    ).fetchone()
+    if row is not None:
+        conn.execute(
+            'UPDATE dashboard_registry SET used_at = ? WHERE base_url = ? AND database_id = ? '
+            'AND schema_name = ? AND dataset_name = ? AND schema_fingerprint = ? AND profile_bucket = ? '
+            'AND plan_version = ?',
+            (time.time(),) + _key(base_url, database_id, schema, dataset_name, fingerprint, bucket, plan_version)
+        )
+        conn.commit()
+    conn.close()
+    if row is None:
+        return None
+    entry = dict(row)
+    entry["chart_ids"] = json.loads(entry["chart_ids"])
+    return entry
+
+
+def has_registered_dashboard(base_url, database_id, schema, dataset_name, plan_version):
+    """
+    True when some dashboard (for any schema) is registered for the dataset.
+    """
+    conn = get_state_connection()
+    row = conn.execute(
+        'SELECT 1 FROM dashboard_registry WHERE base_url = ? AND database_id = ? AND schema_name = ? '
+        'AND dataset_name = ? AND plan_version = ?',
+        (base_url, database_id, schema or "", dataset_name, plan_version)
+    ).fetchone()
+    conn.close()
+    return row is not None
+
+
+def register_dashboard(base_url, database_id, schema, dataset_name, fingerprint, bucket, plan_version,
+                       dataset_id, dashboard_id, chart_ids, embed_uuid):
+    """
+    Remember a freshly built dashboard. Entries for other schemas or profile buckets of the same
+    dataset are dropped: the table now has this schema, so their charts may reference columns
+    that are gone.
+    """
+    now = time.time()
+    conn = get_state_connection()
+    conn.execute(
+        'DELETE FROM dashboard_registry WHERE base_url = ? AND database_id = ? AND schema_name = ? '
+        'AND dataset_name = ?',
+        (base_url, database_id, schema or "", dataset_name)
+    )
+    conn.execute(
+        'INSERT INTO dashboard_registry '
+        '(base_url, database_id, schema_name, dataset_name, schema_fingerprint, profile_bucket, plan_version, '
+        'dataset_id, dashboard_id, chart_ids, embed_uuid, created_at, used_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        _key(base_url, database_id, schema, dataset_name, fingerprint, bucket, plan_version)
+        + (dataset_id, dashboard_id, json.dumps(chart_ids), embed_uuid, now, now)
+    )
+    conn.commit()
+    conn.close()
+
+
+def forget_dashboard(base_url, database_id, schema, dataset_name):
+    conn = get_state_connection()
+    conn.execute(
+        'DELETE FROM dashboard_registry WHERE base_url = ? AND database_id = ? AND schema_name = ? '
+        'AND dataset_name = ?',
+        (base_url, database_id, schema or "", dataset_name)
+    )
+    conn.commit()
+    conn.close()
+
@@ -0,0 +1,108 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Total bytes of DataFrames (as measured by memory_usage(deep=True)) the cache may hold
+DATASET_CACHE_BYTES = int(os.environ.get("XRAY_DATASET_CACHE_BYTES", 512 * 1024 * 1024))
+# A parsed frame takes about 2.2-2.7x its JSON file's size (strings become Python objects);
+# rounded up so borderline files are streamed rather than parsed whole and then not cached
+FRAME_BYTES_PER_FILE_BYTE = 3
+# Only files whose frame is expected to take at most this share of the budget are parsed whole
+DATASET_CACHE_MAX_SHARE = 0.25
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+class DatasetCache:
+    """
+    LRU cache of parsed, typed DataFrames bounded by their measured in-memory size.
+    """
+
+    def __init__(self, max_bytes=DATASET_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, df):
+        nbytes = frame_nbytes(df)
+        if nbytes > self.max_bytes:
+            print(f"Dataset {key[0]} ({nbytes} bytes) exceeds the cache budget, not cached.")
+            return
+        with self._lock:
+            # A newer version of the same file replaces the old one
+            for old_key in [k for k in self._entries if k[0] == key[0]]:
+                self._remove(old_key)
+            self._entries[key] = (df, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, nbytes = self._entries.pop(key)
+        self.current_bytes -= nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+dataset_cache = DatasetCache()
+
+
+def dataset_cache_key(file_path):
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+def estimated_frame_bytes(file_path):
+    return os.path.getsize(file_path) * FRAME_BYTES_PER_FILE_BYTE
+
+
+def is_cacheable(file_path):
+    """
+    Only files whose parsed frame should fit a share of the cache budget are parsed whole into
+    the cache; everything else is streamed, keeping memory flat.
+    """
+    return estimated_frame_bytes(file_path) <= dataset_cache.max_bytes * DATASET_CACHE_MAX_SHARE
+
+
+def get_cached_dataset(file_path, loader):
+    """
+    Return the typed DataFrame for file_path from the cache, parsing it with loader(file_path) on a miss.
+    """
+    key = dataset_cache_key(file_path)
+    df = dataset_cache.get(key)
+    if df is None:
+        df = loader(file_path)
+        dataset_cache.put(key, df)
+    return df
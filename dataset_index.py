@@ -0,0 +1,195 @@
+"""
+Local (table, schema, database) -> id index of the datasets registered in Superset.
+
+The first sync pages through the whole dataset list. Later syncs list the datasets newest
+change first and stop at the newest changed_on already indexed, which is usually a single
+page. Datasets deleted in Superset are only noticed when a full sync runs
+(DATASET_INDEX_FULL_SYNC_SECONDS) or when a caller hits a 404 and calls forget_dataset.
+"""
+import os
+import threading
+import time
+from state_store import get_state_connection
+
+DATASET_ENDPOINT = "/api/v1/dataset/"
+DATASET_PAGE_SIZE = 100
+DATASET_INDEX_FULL_SYNC_SECONDS = int(os.environ.get("XRAY_DATASET_INDEX_FULL_SYNC_SECONDS", 24 * 3600))
+LIST_COLUMNS = ["id", "table_name", "schema", "database.id", "changed_on_utc"]
+
+_sync_locks = {}
+_sync_locks_lock = threading.Lock()
+
+
+def init_dataset_index():
+    conn = get_state_connection()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS dataset_index (
+            base_url TEXT NOT NULL,
+            database_id INTEGER NOT NULL,
+            schema_name TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            dataset_id INTEGER NOT NULL,
+            changed_on TEXT,
+            PRIMARY KEY (base_url, database_id, schema_name, table_name)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS dataset_index_sync (
+            base_url TEXT PRIMARY KEY,
+            changed_on TEXT,
+            full_synced_at REAL NOT NULL,
+            synced_at REAL NOT NULL
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def rison_dumps(value):
+    """
+    Encode a value as Rison, the format of Superset's `q` list parameter.
+    """
+    if value is True:
+        return "!t"
+    if value is False:
+        return "!f"
+    if value is None:
+        return "!n"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, str):
+        return "'" + value.replace("!", "!!").replace("'", "!'") + "'"
+    if isinstance(value, dict):
+        return "(" + ",".join(f"{rison_dumps(str(k))}:{rison_dumps(v)}" for k, v in value.items()) + ")"
+    if isinstance(value, (list, tuple)):
+        return "!(" + ",".join(rison_dumps(v) for v in value) + ")"
+    raise TypeError(f"Cannot encode {type(value).__name__} as Rison")
+
+
+def _sync_lock(base_url):
+    with _sync_locks_lock:
+        return _sync_locks.setdefault(base_url, threading.Lock())
+
+
+def _sync_state(conn, base_url):
+    return conn.execute('SELECT * FROM dataset_index_sync WHERE base_url = ?', (base_url,)).fetchone()
+
+
+def _row(base_url, dataset):
+    database = dataset.get("database")
+    database_id = database.get("id") if isinstance(database, dict) else database
+    return (base_url, database_id, dataset.get("schema") or "", dataset["table_name"], dataset["id"],
+            dataset.get("changed_on_utc") or dataset.get("changed_on"))
+
+
+def _list_page(client, page, descending):
+    query = {
+        "columns": LIST_COLUMNS,
+        "order_column": "changed_on_delta_humanized",
+        "order_direction": "desc" if descending else "asc",
+        "page": page,
+        "page_size": DATASET_PAGE_SIZE,
+    }
+    response = client.get(DATASET_ENDPOINT, params={"q": rison_dumps(query)})
+    response.raise_for_status()
+    body = response.json()
+    return body.get("result", []), body.get("count", 0)
+
+
+def sync_dataset_index(client, full=False):
+    """
+    Bring the index for client's Superset up to date; returns the number of datasets fetched.
+    """
+    base_url = client.base_url
+    with _sync_lock(base_url):
+        conn = get_state_connection()
+        try:
+            state = _sync_state(conn, base_url)
+            now = time.time()
+            full = full or state is None or now - state["full_synced_at"] > DATASET_INDEX_FULL_SYNC_SECONDS
+            watermark = None if full else state["changed_on"]
+
+            rows = []
+            page = 0
+            while True:
+                datasets, count = _list_page(client, page, descending=True)
+                fresh = [d for d in datasets if watermark is None
+                         or (d.get("changed_on_utc") or d.get("changed_on") or "") >= watermark]
+                rows.extend(_row(base_url, dataset) for dataset in fresh)
+                page += 1
+                # Pages run newest first, so the first already-indexed change ends an incremental sync
+                if len(fresh) < len(datasets) or len(datasets) < DATASET_PAGE_SIZE or page * DATASET_PAGE_SIZE >= count:
+                    break
+
+            if full:
+                conn.execute('DELETE FROM dataset_index WHERE base_url = ?', (base_url,))
+            conn.executemany(
+                'INSERT OR REPLACE INTO dataset_index '
+                '(base_url, database_id, schema_name, table_name, dataset_id, changed_on) VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            changed_on = max([row[5] for row in rows if row[5]] + ([watermark] if watermark else []), default=None)
+            conn.execute(
+                'INSERT OR REPLACE INTO dataset_index_sync (base_url, changed_on, full_synced_at, synced_at) '
+                'VALUES (?, ?, ?, ?)',
+                (base_url, changed_on, now if full else state["full_synced_at"], now)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    print(f"Dataset index for {base_url}: {'full' if full else 'incremental'} sync, {len(rows)} dataset(s) fetched.")
+    return len(rows)
+
+
+def _lookup(base_url, table_name, database_id, schema):
+    conn = get_state_connection()
+    if database_id is None:
+        row = conn.execute(
+            'SELECT dataset_id FROM dataset_index WHERE base_url = ? AND table_name = ? ORDER BY changed_on DESC',
+            (base_url, table_name)
+        ).fetchone()
+    else:
+        row = conn.execute(
+            'SELECT dataset_id FROM dataset_index WHERE base_url = ? AND database_id = ? AND schema_name = ? '
+            'AND table_name = ?',
+            (base_url, database_id, schema or "", table_name)
+        ).fetchone()
+    conn.close()
+    return row["dataset_id"] if row else None
+
+
+def lookup_dataset(client, table_name, database_id=None, schema=None):
+    """
+    Dataset id for a table, from the local index. On a miss the index is synced once and the
+    lookup retried, so datasets created elsewhere are still found.
+    """
+    dataset_id = _lookup(client.base_url, table_name, database_id, schema)
+    if dataset_id is None:
+        sync_dataset_index(client)
+        dataset_id = _lookup(client.base_url, table_name, database_id, schema)
+    return dataset_id
+
+
+def index_dataset(client, dataset_id, table_name, database_id, schema, changed_on=None):
+    """
+    Add a dataset this process just created, without waiting for the next sync.
+    """
+    conn = get_state_connection()
+    conn.execute(
+        'INSERT OR REPLACE INTO dataset_index '
+        '(base_url, database_id, schema_name, table_name, dataset_id, changed_on) VALUES (?, ?, ?, ?, ?, ?)',
+        (client.base_url, database_id, schema or "", table_name, dataset_id, changed_on)
+    )
+    conn.commit()
+    conn.close()
+
+
+def forget_dataset(client, dataset_id):
+    """
+    Drop an entry whose dataset turned out to be deleted in Superset.
+    """
+    conn = get_state_connection()
+    conn.execute('DELETE FROM dataset_index WHERE base_url = ? AND dataset_id = ?', (client.base_url, dataset_id))
+    conn.commit()
+    conn.close()
+
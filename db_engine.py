@@ -0,0 +1,92 @@
+import os
+import threading
+import sqlalchemy
+from bulk_load import engine_connect_args
+
+# Pool settings shared by every engine in the registry; override through the environment
+DB_POOL_SIZE = int(os.environ.get("XRAY_DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("XRAY_DB_MAX_OVERFLOW", 10))
+DB_POOL_RECYCLE = int(os.environ.get("XRAY_DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.environ.get("XRAY_DB_POOL_PRE_PING", "1") == "1"
+DB_POOL_WARMUP = int(os.environ.get("XRAY_DB_POOL_WARMUP", 1))
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _create_engine(db_connection_string):
+    url = sqlalchemy.engine.make_url(db_connection_string)
+    options = {
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "connect_args": engine_connect_args(db_connection_string),
+    }
+    # SQLite picks its own pool class (SingletonThreadPool for :memory:), which rejects sizing options
+    if url.get_backend_name() != "sqlite":
+        options["pool_size"] = DB_POOL_SIZE
+        options["max_overflow"] = DB_MAX_OVERFLOW
+    return sqlalchemy.create_engine(url, **options)
+
+
+def warm_up(engine, connections=DB_POOL_WARMUP):
+    """
+    Open `connections` connections and return them to the pool so the first requests
+    do not pay for connection setup and dialect initialization.
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    except sqlalchemy.exc.DBAPIError as e:
+        print(f"Engine warm-up failed: {e.orig}")
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+def get_engine(db_connection_string):
+    """
+    Return the process-wide pooled engine for a connection string, creating and warming it up
+    on first use.
+    """
+    engine = _engines.get(db_connection_string)
+    if engine is not None:
+        return engine
+    with _engines_lock:
+        engine = _engines.get(db_connection_string)
+        if engine is None:
+            engine = _create_engine(db_connection_string)
+            warm_up(engine)
+            _engines[db_connection_string] = engine
+    return engine
+
+
+def pool_stats():
+    """
+    Pool statistics for every registered engine, keyed by connection string with the password hidden.
+    """
+    stats = {}
+    for db_connection_string, engine in list(_engines.items()):
+        pool = engine.pool
+        entry = {"pool_class": type(pool).__name__, "status": pool.status()}
+        if isinstance(pool, sqlalchemy.pool.QueuePool):
+            entry.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            })
+        key = engine.url.render_as_string(hide_password=True)
+        stats[key] = entry
+    return stats
+
+
+def dispose_engines(close=True):
+    """
+    Close every pooled connection and forget all engines. Forked worker processes pass
+    close=False so they drop the inherited pools without closing the parent's connections.
+    """
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose(close=close)
+        _engines.clear()
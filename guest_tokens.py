@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from superset_client import jwt_expiry
+
+GUEST_TOKEN_ENDPOINT = "/api/v1/security/guest_token/"
+GUEST_USER = {"username": "embed_user"}
+# Superset's default GUEST_TOKEN_JWT_EXP_SECONDS, used when a token has no readable exp claim
+GUEST_TOKEN_DEFAULT_TTL = 5 * 60
+# Tokens are never handed out with less than this many seconds left
+GUEST_TOKEN_EXPIRY_MARGIN = 10
+# The background refresher renews tokens this many seconds before they expire...
+GUEST_TOKEN_REFRESH_AHEAD = int(os.environ.get("XRAY_GUEST_TOKEN_REFRESH_AHEAD", 60))
+# ...but only tokens requested within this many seconds; idle ones are left to expire and dropped
+GUEST_TOKEN_IDLE_SECONDS = int(os.environ.get("XRAY_GUEST_TOKEN_IDLE_SECONDS", 15 * 60))
+GUEST_TOKEN_REFRESH_INTERVAL = 5
+# At most this many tokens are cached (and refreshed); the least recently used go first
+GUEST_TOKEN_MAX_ENTRIES = int(os.environ.get("XRAY_GUEST_TOKEN_MAX_ENTRIES", 1000))
+
+
+def guest_token_key(dashboard_id, rls=None, user=None):
+    return (str(dashboard_id), json.dumps(rls or [], sort_keys=True), json.dumps(user or GUEST_USER, sort_keys=True))
+
+
+class GuestTokenCache:
+    """
+    Guest tokens keyed by (dashboard, RLS rules, guest user).
+
+    A cached token is served until shortly before its exp claim. Concurrent misses for the same
+    key share one mint. A daemon thread renews recently used tokens before they expire, so page
+    loads normally never wait for Superset.
+    """
+
+    def __init__(self, client_factory):
+        self.client_factory = client_factory
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._refresher = None
+        self.hits = 0
+        self.misses = 0
+        self.mints = 0
+        self.background_refreshes = 0
+        self.errors = 0
+
+    def _mint(self, key, dashboard_id, rls, user):
+        payload = {
+            "resources": [{"type": "dashboard", "id": dashboard_id}],
+            "user": user or GUEST_USER,
+            "rls": rls or [],
+        }
+        response = self.client_factory().post(GUEST_TOKEN_ENDPOINT, json=payload)
+        if response.status_code != 200:
+            raise Exception(f"Failed to generate guest token {response.text}")
+        token = response.json().get("token")
+        return {
+            "token": token,
+            "expires_at": jwt_expiry(token, GUEST_TOKEN_DEFAULT_TTL),
+            "dashboard_id": dashboard_id,
+            "rls": rls,
+            "user": user,
+        }
+
+    def _mint_once(self, key, dashboard_id, rls, user):
+        """
+        Mint a token for key, or wait for the mint another thread already started.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            return future.result()
+
+        try:
+            entry = self._mint(key, dashboard_id, rls, user)
+            with self._lock:
+                previous = self._entries.get(key)
+                entry["last_used"] = previous["last_used"] if previous else time.time()
+                self._entries[key] = entry
+                self.mints += 1
+                while len(self._entries) > GUEST_TOKEN_MAX_ENTRIES:
+                    oldest = min((k for k in self._entries if k != key), key=lambda k: self._entries[k]["last_used"])
+                    del self._entries[oldest]
+            future.set_result(entry)
+            return entry
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get(self, dashboard_id, rls=None, user=None):
+        key = guest_token_key(dashboard_id, rls, user)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now < entry["expires_at"] - GUEST_TOKEN_EXPIRY_MARGIN:
+                entry["last_used"] = now
+                self.hits += 1
+                return entry["token"]
+            self.misses += 1
+        self._start_refresher()
+        entry = self._mint_once(key, dashboard_id, rls, user)
+        with self._lock:
+            entry["last_used"] = now
+        return entry["token"]
+
+    def _refresh_due(self):
+        now = time.time()
+        with self._lock:
+            for key in [k for k, e in self._entries.items()
+                        if now - e["last_used"] > GUEST_TOKEN_IDLE_SECONDS and now >= e["expires_at"]]:
+                del self._entries[key]
+            due = [(key, dict(entry)) for key, entry in self._entries.items()
+                   if key not in self._inflight
+                   and now - entry["last_used"] <= GUEST_TOKEN_IDLE_SECONDS
+                   and entry["expires_at"] - now <= GUEST_TOKEN_REFRESH_AHEAD]
+        for key, entry in due:
+            try:
+                self._mint_once(key, entry["dashboard_id"], entry["rls"], entry["user"])
+                with self._lock:
+                    self.background_refreshes += 1
+            except Exception as e:
+                print(f"Background guest token refresh for dashboard {entry['dashboard_id']} failed: {e}")
+
+    def _run_refresher(self):
+        while True:
+            time.sleep(GUEST_TOKEN_REFRESH_INTERVAL)
+            self._refresh_due()
+
+    def _start_refresher(self):
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._run_refresher, name="guest-token-refresh", daemon=True)
+                self._refresher.start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "mints": self.mints,
+                "background_refreshes": self.background_refreshes,
+                "errors": self.errors,
+            }
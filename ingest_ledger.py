@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import time
+import sqlalchemy
+from sqlalchemy import inspect
+from state_store import get_state_connection
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def init_ledger():
+    conn = get_state_connection()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ingest_ledger (
+            db_key TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            loaded_at REAL NOT NULL,
+            profile TEXT,
+            PRIMARY KEY (db_key, table_name)
+        )
+    ''')
+    if "profile" not in [row["name"] for row in conn.execute('PRAGMA table_info(ingest_ledger)')]:
+        conn.execute('ALTER TABLE ingest_ledger ADD COLUMN profile TEXT')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS derived_tables (
+            db_key TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            source_table TEXT NOT NULL,
+            source_loaded_at REAL NOT NULL,
+            built_at REAL NOT NULL,
+            PRIMARY KEY (db_key, table_name)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS index_builds (
+            db_key TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            columns TEXT NOT NULL,
+            load_seconds REAL NOT NULL,
+            index_seconds REAL NOT NULL,
+            built_at REAL NOT NULL,
+            PRIMARY KEY (db_key, table_name)
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def _db_key(db_connection_string):
+    return sqlalchemy.engine.make_url(db_connection_string).render_as_string(hide_password=True)
+
+
+def content_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _get_entry(db_connection_string, table_name):
+    conn = get_state_connection()
+    row = conn.execute(
+        'SELECT * FROM ingest_ledger WHERE db_key = ? AND table_name = ?',
+        (_db_key(db_connection_string), table_name)
+    ).fetchone()
+    conn.close()
+    return row
+
+
+def is_ingest_current(file_path, db_connection_string, table_name, engine):
+    """
+    True when table_name was last loaded from this exact file content and still exists.
+    size+mtime is checked first; the content hash is only computed when the mtime moved
+    but the size did not (e.g. the file was touched or copied over unchanged).
+    """
+    entry = _get_entry(db_connection_string, table_name)
+    if entry is None or entry["file_path"] != os.path.abspath(file_path):
+        return False
+
+    stat = os.stat(file_path)
+    if stat.st_size != entry["size"]:
+        return False
+    if stat.st_mtime_ns != entry["mtime_ns"]:
+        if content_hash(file_path) != entry["sha256"]:
+            return False
+        conn = get_state_connection()
+        conn.execute(
+            'UPDATE ingest_ledger SET mtime_ns = ? WHERE db_key = ? AND table_name = ?',
+            (stat.st_mtime_ns, _db_key(db_connection_string), table_name)
+        )
+        conn.commit()
+        conn.close()
+
+    return inspect(engine).has_table(table_name)
+
+
+def file_fingerprint(file_path):
+    """
+    Take the fingerprint before loading, so edits made during the load are not recorded as loaded.
+    """
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": content_hash(file_path)}
+
+
+def record_ingest(file_path, db_connection_string, table_name, fingerprint, profile=None):
+    """
+    Remember which file content table_name now holds, with its profile (see get_ingest_profile).
+    """
+    conn = get_state_connection()
+    conn.execute(
+        'INSERT OR REPLACE INTO ingest_ledger '
+        '(db_key, table_name, file_path, size, mtime_ns, sha256, loaded_at, profile) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        (_db_key(db_connection_string), table_name, os.path.abspath(file_path),
+         fingerprint["size"], fingerprint["mtime_ns"], fingerprint["sha256"], time.time(),
+         json.dumps(profile, default=str) if profile is not None else None)
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_ingest_profile(db_connection_string, table_name):
+    """
+    The profile recorded with the table's current load, or None. It belongs to the file content
+    the entry's fingerprint describes, so it is valid whenever is_ingest_current is.
+    """
+    entry = _get_entry(db_connection_string, table_name)
+    return json.loads(entry["profile"]) if entry is not None and entry["profile"] else None
+
+
+def record_ingest_profile(db_connection_string, table_name, profile):
+    conn = get_state_connection()
+    conn.execute(
+        'UPDATE ingest_ledger SET profile = ? WHERE db_key = ? AND table_name = ?',
+        (json.dumps(profile, default=str), _db_key(db_connection_string), table_name)
+    )
+    conn.commit()
+    conn.close()
+
+
+def forget_ingest(db_connection_string, table_name):
+    conn = get_state_connection()
+    conn.execute(
+        'DELETE FROM ingest_ledger WHERE db_key = ? AND table_name = ?',
+        (_db_key(db_connection_string), table_name)
+    )
+    conn.commit()
+    conn.close()
+
+
+
+def is_derived_current(db_connection_string, table_name, source_table, engine):
+    """
+    True when table_name (e.g. a rollup) was built from the load of source_table the ledger
+    currently records, and still exists. Sources loaded outside the ledger never count as current.
+    """
+    source = _get_entry(db_connection_string, source_table)
+    if source is None:
+        return False
+    conn = get_state_connection()
+    row = conn.execute(
+        'SELECT source_loaded_at FROM derived_tables WHERE db_key = ? AND table_name = ? AND source_table = ?',
+        (_db_key(db_connection_string), table_name, source_table)
+    ).fetchone()
+    conn.close()
+    if row is None or row["source_loaded_at"] != source["loaded_at"]:
+        return False
+    return inspect(engine).has_table(table_name)
+
+
+def record_derived(db_connection_string, table_name, source_table):
+    """
+    Remember that table_name was just built from source_table's current load. Tables built from a
+    source loaded outside the ledger are recorded too, so derived_tables_of still finds them.
+    """
+    source = _get_entry(db_connection_string, source_table)
+    conn = get_state_connection()
+    conn.execute(
+        'INSERT OR REPLACE INTO derived_tables (db_key, table_name, source_table, source_loaded_at, built_at) '
+        'VALUES (?, ?, ?, ?, ?)',
+        (_db_key(db_connection_string), table_name, source_table, source["loaded_at"] if source else 0,
+         time.time())
+    )
+    conn.commit()
+    conn.close()
+
+
+def derived_tables_of(db_connection_string, source_table):
+    """
+    Names of the tables recorded as built from source_table.
+    """
+    conn = get_state_connection()
+    rows = conn.execute(
+        'SELECT table_name FROM derived_tables WHERE db_key = ? AND source_table = ? ORDER BY table_name',
+        (_db_key(db_connection_string), source_table)
+    ).fetchall()
+    conn.close()
+    return [row["table_name"] for row in rows]
+
+
+def forget_derived(db_connection_string, table_name):
+    conn = get_state_connection()
+    conn.execute(
+        'DELETE FROM derived_tables WHERE db_key = ? AND table_name = ?',
+        (_db_key(db_connection_string), table_name)
+    )
+    conn.commit()
+    conn.close()
+
+
+def record_index_build(db_connection_string, table_name, columns, load_seconds, index_seconds):
+    """
+    Remember which columns the last load of table_name indexed, and how long the bulk insert and
+    the index builds each took.
+    """
+    conn = get_state_connection()
+    conn.execute(
+        'INSERT OR REPLACE INTO index_builds (db_key, table_name, columns, load_seconds, index_seconds, built_at) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        (_db_key(db_connection_string), table_name, json.dumps(columns), load_seconds, index_seconds, time.time())
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_index_build(db_connection_string, table_name):
+    conn = get_state_connection()
+    row = conn.execute(
+        'SELECT * FROM index_builds WHERE db_key = ? AND table_name = ?',
+        (_db_key(db_connection_string), table_name)
+    ).fetchone()
+    conn.close()
+    if row is None:
+        return None
+    return {
+        "columns": json.loads(row["columns"]),
+        "load_seconds": row["load_seconds"],
+        "index_seconds": row["index_seconds"],
+        "built_at": row["built_at"],
+    }
+
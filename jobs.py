@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Dashboard builds allowed to run at once; further jobs wait in the executor's queue
+JOB_WORKERS = int(os.environ.get("XRAY_JOB_WORKERS", 2))
+# Finished jobs are forgotten after this many seconds
+JOB_TTL_SECONDS = int(os.environ.get("XRAY_JOB_TTL_SECONDS", 3600))
+
+
+class Job:
+    """
+    One dashboard build with its stage-by-stage progress.
+    """
+
+    def __init__(self, key):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = "queued"
+        self.stage = "queued"
+        self.progress = 0
+        self.stages = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._external_stages = False
+        self._lock = threading.Lock()
+
+    def update(self, stage, progress, stages=None):
+        """
+        Progress callback handed to the pipeline: record entering a stage at a given percentage.
+        A pipeline whose stages overlap passes its own timings as `stages`; they replace the
+        sequential timeline and the current stage becomes the list of stages still running.
+        """
+        with self._lock:
+            now = time.time()
+            if stages is not None:
+                self._external_stages = True
+                self.stages = stages
+                self.stage = ", ".join(s["stage"] for s in stages if s["seconds"] is None) or stage
+            elif not self._external_stages and stage != self.stage:
+                if self.stages:
+                    self.stages[-1]["seconds"] = round(now - self.stages[-1]["started_at"], 3)
+                self.stages.append({"stage": stage, "started_at": now, "seconds": None})
+                self.stage = stage
+            self.progress = max(self.progress, min(int(progress), 100))
+            self.updated_at = now
+
+    def _finish(self, status, result=None, error=None):
+        with self._lock:
+            now = time.time()
+            if self.stages and self.stages[-1]["seconds"] is None:
+                self.stages[-1]["seconds"] = round(now - self.stages[-1]["started_at"], 3)
+            self.status = status
+            self.result = result
+            self.error = error
+            if status == "done":
+                self.progress = 100
+            self.updated_at = now
+
+    def is_finished(self):
+        return self.status in ("done", "failed")
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "key": self.key,
+                "status": self.status,
+                "stage": self.stage,
+                "progress": self.progress,
+                "stages": [dict(stage) for stage in self.stages],
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "updated_at": self.updated_at,
+            }
+
+
+class JobManager:
+    """
+    Runs dashboard builds on a bounded executor. A build already queued or running for the same
+    key is reused instead of being started twice.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="xray-job")
+        self._jobs = {}
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, func, *args, **kwargs):
+        """
+        Queue func(*args, progress_callback=job.update, **kwargs) and return its Job.
+        """
+        with self._lock:
+            self._prune()
+            active = self._active.get(key)
+            if active is not None and not active.is_finished():
+                return active
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._active[key] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        job.status = "running"
+        try:
+            result = func(*args, progress_callback=job.update, **kwargs)
+            job._finish("done", result=result)
+        except Exception as e:
+            traceback.print_exc()
+            job._finish("failed", error=str(e))
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL_SECONDS
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.is_finished() and job.updated_at < cutoff]:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
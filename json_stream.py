@@ -0,0 +1,121 @@
+import json
+
+# Size of each read from disk and the default number of rows handed out per chunk
+READ_SIZE = 1 << 20
+DEFAULT_CHUNK_ROWS = 50000
+
+_WHITESPACE = " \t\n\r"
+
+
+class JsonDatasetStream:
+    """
+    Incrementally read a dataset file of the form {"name": ..., "schema": [...], "data": [[...], ...]}.
+
+    The header keys (everything before "data") are parsed up front so the schema is known
+    before any row is read; the rows of the "data" array are then decoded one at a time and
+    handed out in lists of at most `chunk_rows`, so only one chunk is held in memory.
+    """
+
+    def __init__(self, file_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+        self.file_path = file_path
+        self.chunk_rows = chunk_rows
+        self.header = {}
+        self._file = open(file_path, 'r', encoding='utf-8')
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._read_header()
+
+    @property
+    def name(self):
+        return self.header.get("name")
+
+    @property
+    def schema(self):
+        return self.header.get("schema")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def _fill(self):
+        chunk = self._file.read(READ_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+        # Drop the consumed prefix so the buffer only ever holds unparsed text
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError(f"Unexpected end of file in '{self.file_path}'")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self._pos} in '{self.file_path}'")
+        self._pos += 1
+
+    def _decode_value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # A bare number at the end of the buffer may continue in the next read
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def _read_header(self):
+        self._expect("{")
+        while True:
+            if self._peek() == "}":
+                raise ValueError(f"No 'data' array found in '{self.file_path}'")
+            key = self._decode_value()
+            self._expect(":")
+            if key == "data":
+                break
+            self.header[key] = self._decode_value()
+            if self._peek() == ",":
+                self._pos += 1
+        if self.schema is None:
+            raise ValueError(f"'schema' must appear before 'data' in '{self.file_path}'")
+        self._expect("[")
+
+    def iter_chunks(self):
+        """
+        Yield lists of rows from the "data" array, each holding at most `chunk_rows` rows.
+        """
+        rows = []
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            rows.append(self._decode_value())
+            if len(rows) >= self.chunk_rows:
+                yield rows
+                rows = []
+            separator = self._peek()
+            self._pos += 1
+            if separator == "]":
+                break
+            if separator != ",":
+                raise ValueError(f"Malformed 'data' array in '{self.file_path}'")
+        if rows:
+            yield rows
@@ -0,0 +1,114 @@
+"""
+Persistent cache of chart plans.
+
+A plan (the selected visualizations, their create-chart payloads without dataset and dashboard
+ids, and the pruned candidates) only depends on the schema and a few column statistics. Plans
+are stored per schema fingerprint, profile bucket and planner version, so a repeat build skips
+planning and payload construction. Storing a plan drops those of older planner versions.
+
+The bucket is the profile reduced to what the planner reads, rounded up: counts to two
+significant figures and null ratios to hundredths. Every planner threshold is such a round
+number, so it compares the same way against the bucket as against the exact value, and planning
+from the bucket itself makes a cached plan identical to a fresh one.
+"""
+import hashlib
+import json
+import math
+import os
+import time
+from state_store import get_state_connection
+
+PLAN_CACHE_MAX_ENTRIES = int(os.environ.get("XRAY_PLAN_CACHE_MAX_ENTRIES", 1000))
+
+
+def init_plan_cache():
+    conn = get_state_connection()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS plan_cache (
+            schema_fingerprint TEXT NOT NULL,
+            profile_bucket TEXT NOT NULL,
+            plan_version INTEGER NOT NULL,
+            plan TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            used_at REAL NOT NULL,
+            PRIMARY KEY (schema_fingerprint, profile_bucket, plan_version)
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def _round_up(count):
+    """
+    count rounded up to two significant figures.
+    """
+    count = int(math.ceil(count))
+    if count < 100:
+        return count
+    step = 10 ** (len(str(count)) - 2)
+    return -(-count // step) * step
+
+
+def profile_bucket(profile, settings=None):
+    """
+    The coarse profile plan_visualizations and select_visualizations can be run on. A numeric
+    column's standard deviation only matters as zero or not. settings (e.g. the selection
+    budgets) are carried along so they are part of the bucket key.
+    """
+    return {
+        "rows": _round_up(profile["rows"]),
+        "settings": settings,
+        "columns": [
+            {
+                "name": column["name"],
+                "dtype": column["dtype"],
+                "kind": column["kind"],
+                "null_ratio": math.ceil(round(column["null_ratio"] * 100, 6)) / 100,
+                "cardinality": _round_up(column["cardinality"]),
+                "std": 1.0 if column.get("std") else 0.0,
+            }
+            for column in profile["columns"]
+        ],
+    }
+
+
+def bucket_key(bucket):
+    return hashlib.sha256(json.dumps(bucket, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def find_plan(fingerprint, bucket, plan_version):
+    conn = get_state_connection()
+    row = conn.execute(
+        'SELECT plan FROM plan_cache WHERE schema_fingerprint = ? AND profile_bucket = ? AND plan_version = ?',
+        (fingerprint, bucket, plan_version)
+    ).fetchone()
+    if row is not None:
+        conn.execute(
+            'UPDATE plan_cache SET used_at = ? WHERE schema_fingerprint = ? AND profile_bucket = ? AND plan_version = ?',
+            (time.time(), fingerprint, bucket, plan_version)
+        )
+        conn.commit()
+    conn.close()
+    return json.loads(row["plan"]) if row is not None else None
+
+
+def store_plan(fingerprint, bucket, plan_version, plan):
+    """
+    Save a plan, drop plans of other planner versions and keep at most PLAN_CACHE_MAX_ENTRIES,
+    least recently used first out.
+    """
+    now = time.time()
+    conn = get_state_connection()
+    conn.execute('DELETE FROM plan_cache WHERE plan_version != ?', (plan_version,))
+    conn.execute(
+        'INSERT OR REPLACE INTO plan_cache (schema_fingerprint, profile_bucket, plan_version, plan, created_at, '
+        'used_at) VALUES (?, ?, ?, ?, ?, ?)',
+        (fingerprint, bucket, plan_version, json.dumps(plan, default=str), now, now)
+    )
+    conn.execute(
+        'DELETE FROM plan_cache WHERE rowid NOT IN (SELECT rowid FROM plan_cache ORDER BY used_at DESC LIMIT ?)',
+        (PLAN_CACHE_MAX_ENTRIES,)
+    )
+    conn.commit()
+    conn.close()
+
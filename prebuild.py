@@ -0,0 +1,127 @@
+"""
+Batch pre-build of the dashboards for every registered dataset.
+
+Ingest (JSON parsing, type coercion, sidecar and table load, profiling) runs on a process pool;
+the Superset calls run on a small thread pool as soon as each dataset's ingest finishes, from the
+profile the ingest worker sends back.
+
+Usage: python prebuild.py [keyword ...]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from db_engine import dispose_engines
+from state_store import init_state
+
+INGEST_WORKERS = int(os.environ.get("XRAY_PREBUILD_INGEST_WORKERS", min(4, os.cpu_count() or 1)))
+SUPERSET_IO_WORKERS = int(os.environ.get("XRAY_PREBUILD_IO_WORKERS", 2))
+
+
+def dataset_table_name(base_name, keyword):
+    """
+    "rester_sample", "code review" -> "rester_sample_code_review"; one table per dataset so
+    builds for different keywords never write into the same table.
+    """
+    return f"{base_name}_{keyword.strip().lower().replace(' ', '_')}"
+
+
+def _init_ingest_worker():
+    # Drop pools inherited from the parent process instead of sharing its sockets
+    dispose_engines(close=False)
+
+
+def _ingest_worker(file_path, db_connection_string, table_name):
+    """
+    Returns (profile, seconds); the profile is a plain dict, so it pickles back cheaply.
+    """
+    from x_ray_feature import ingest_json_file
+    start = time.perf_counter()
+    profile = ingest_json_file(file_path, db_connection_string, table_name)
+    return profile, time.perf_counter() - start
+
+
+def _superset_worker(profile, db_connection_string, dataset_name, dashboard_title, database_id, schema):
+    from x_ray_feature import authenticate, build_dashboard
+    start = time.perf_counter()
+    client = authenticate()
+    # The dataset is named after its table, which the charts' rollups are built from
+    embed_url = build_dashboard(client, profile, dataset_name, dashboard_title, database_id, schema,
+                                db_connection_string=db_connection_string, table_name=dataset_name)
+    return embed_url, time.perf_counter() - start
+
+
+def prebuild_dashboards(data_files, db_connection_string, table_name, dashboard_title, database_id, schema,
+                        keywords=None):
+    """
+    Ingest and build the dashboard of every registered dataset concurrently.
+    Returns one report entry per dataset with its status, embed URL and stage timings.
+    """
+    start = time.perf_counter()
+    reports = {}
+    for keyword, file_path in data_files.items():
+        if keywords and keyword not in keywords:
+            continue
+        reports[keyword] = {
+            "keyword": keyword,
+            "file_path": file_path,
+            "table_name": dataset_table_name(table_name, keyword),
+            "status": "pending",
+            "embed_url": None,
+            "ingest_seconds": None,
+            "superset_seconds": None,
+            "error": None,
+        }
+        if not os.path.exists(file_path):
+            reports[keyword].update(status="skipped", error="file not found")
+
+    with ProcessPoolExecutor(max_workers=INGEST_WORKERS, initializer=_init_ingest_worker) as ingest_pool, \
+            ThreadPoolExecutor(max_workers=SUPERSET_IO_WORKERS) as io_pool:
+        ingest_futures = {
+            ingest_pool.submit(_ingest_worker, report["file_path"], db_connection_string, report["table_name"]): report
+            for report in reports.values() if report["status"] == "pending"
+        }
+
+        superset_futures = {}
+        for future in as_completed(ingest_futures):
+            report = ingest_futures[future]
+            try:
+                profile, report["ingest_seconds"] = future.result()
+            except Exception as e:
+                report.update(status="failed", error=f"ingest: {e}")
+                continue
+            superset_future = io_pool.submit(
+                _superset_worker, profile, db_connection_string, report["table_name"],
+                f"{dashboard_title} - {report['keyword']}", database_id, schema
+            )
+            superset_futures[superset_future] = report
+
+        for future in as_completed(superset_futures):
+            report = superset_futures[future]
+            try:
+                report["embed_url"], report["superset_seconds"] = future.result()
+                report["status"] = "built" if report["embed_url"] else "failed"
+            except Exception as e:
+                report.update(status="failed", error=f"superset: {e}")
+
+    print_report(list(reports.values()), time.perf_counter() - start)
+    return list(reports.values())
+
+
+def print_report(reports, total_seconds):
+    def seconds(value):
+        return f"{value:8.2f}" if value is not None else f"{'-':>8}"
+
+    print(f"{'dataset':<22} {'status':<8} {'ingest s':>8} {'superset s':>10}  error")
+    for report in reports:
+        print(f"{report['keyword']:<22} {report['status']:<8} {seconds(report['ingest_seconds'])} "
+              f"{seconds(report['superset_seconds']):>10}  {report['error'] or ''}")
+    print(f"Prebuilt {sum(r['status'] == 'built' for r in reports)}/{len(reports)} datasets "
+          f"in {total_seconds:.2f}s")
+
+
+if __name__ == '__main__':
+    init_state()
+    from app import data_files, DB_CONNECTION_STRING, TABLE_NAME, DASHBOARD_TITLE, DATABASE_ID, SCHEMA
+    prebuild_dashboards(data_files, DB_CONNECTION_STRING, TABLE_NAME, DASHBOARD_TITLE, DATABASE_ID, SCHEMA,
+                        keywords=sys.argv[1:] or None)
@@ -0,0 +1,275 @@
+"""
+Column profiles for the visualization planner.
+
+A profile is a plain dict: the row count plus, per column in order, its dtype, kind, null count
+and ratio, cardinality, min/max, mean/standard deviation (numeric columns) and most frequent
+values. It is computed with whole-frame
+vectorized operations, and everything downstream of the load (chart planning, schema
+fingerprint, dataset metadata) reads the profile, so the DataFrame itself can be released.
+
+Frames larger than PROFILE_SAMPLE_ROWS are profiled from a uniform random sample of that many
+rows. Null ratios then come with a Wilson score interval and cardinalities with the GEE
+estimator and its [observed, worst case] range; a column whose range straddles one of the
+planner's thresholds is re-profiled exactly. Data streamed in chunks is profiled from a
+ReservoirSample kept while it streams past; its borderline columns are made exact with a count
+query on the table it was loaded into (refine_from_table).
+"""
+import math
+import os
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+PROFILE_TOP_K = int(os.environ.get("XRAY_PROFILE_TOP_K", 5))
+# Larger frames are profiled from a sample of this many rows; 0 always profiles exactly
+PROFILE_SAMPLE_ROWS = int(os.environ.get("XRAY_PROFILE_SAMPLE_ROWS", 200000))
+# z for the null-ratio confidence interval (1.96 = 95%)
+PROFILE_CONFIDENCE_Z = 1.96
+
+NUMERIC = "numeric"
+BOOLEAN = "boolean"
+DATETIME = "datetime"
+CATEGORICAL = "categorical"
+OTHER = "other"
+
+
+def column_kind(dtype):
+    """
+    The dtype class the planner reasons about. Booleans are kept apart from numbers, as
+    df.select_dtypes(include='number') does.
+    """
+    if pd.api.types.is_bool_dtype(dtype):
+        return BOOLEAN
+    if pd.api.types.is_numeric_dtype(dtype):
+        return NUMERIC
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return DATETIME
+    if (isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_object_dtype(dtype)
+            or pd.api.types.is_string_dtype(dtype)):
+        return CATEGORICAL
+    return OTHER
+
+
+def _scalar(value):
+    """
+    JSON-friendly version of a pandas/numpy scalar.
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def _profile_columns(df, top_k, population=None):
+    """
+    Profile df's columns. With population set, df is a uniform sample of that many rows and
+    null ratio, cardinality and top-k counts are estimates for the whole population.
+    """
+    rows = len(df)
+    nulls = df.isna().sum()
+    kinds = {column: column_kind(dtype) for column, dtype in df.dtypes.items()}
+    ordered = [column for column, kind in kinds.items() if kind in (NUMERIC, DATETIME)]
+    bounds = df[ordered].agg(["min", "max"]) if ordered and rows else None
+    numeric = [column for column, kind in kinds.items() if kind == NUMERIC]
+    moments = df[numeric].agg(["mean", "std"]) if numeric and rows else None
+    scale = population / rows if population and rows else 1
+
+    columns = []
+    for column, dtype in df.dtypes.items():
+        counts = df[column].value_counts(dropna=True, sort=True)
+        null_count = int(nulls[column])
+        null_ratio = null_count / rows if rows else 0.0
+        if population:
+            null_ratio_bounds = wilson_interval(null_count, rows, population)
+            cardinality, cardinality_bounds = gee_cardinality(counts, rows, population)
+        else:
+            null_ratio_bounds = [null_ratio, null_ratio]
+            cardinality = len(counts)
+            cardinality_bounds = [cardinality, cardinality]
+        columns.append({
+            "name": column,
+            "dtype": str(dtype),
+            "kind": kinds[column],
+            "exact": not population,
+            "nulls": round(null_count * scale),
+            "null_ratio": null_ratio,
+            "null_ratio_bounds": null_ratio_bounds,
+            "cardinality": cardinality,
+            "cardinality_bounds": cardinality_bounds,
+            "min": _scalar(bounds.at["min", column]) if bounds is not None and column in bounds else None,
+            "max": _scalar(bounds.at["max", column]) if bounds is not None and column in bounds else None,
+            "mean": _scalar(moments.at["mean", column]) if moments is not None and column in moments else None,
+            "std": _scalar(moments.at["std", column]) if moments is not None and column in moments else None,
+            "top": [[_scalar(value), round(int(count) * scale)] for value, count in counts.head(top_k).items()],
+        })
+    return columns
+
+
+def wilson_interval(successes, sample_rows, population, z=PROFILE_CONFIDENCE_Z):
+    """
+    Wilson score interval for a proportion observed in a sample drawn without replacement. The
+    finite population correction enters as a larger effective sample size, so the interval still
+    reaches 0 (or 1) when the sample has no (or only) successes, and is the observed ratio when
+    the sample is the whole population.
+    """
+    if not sample_rows:
+        return [0.0, 1.0]
+    p = successes / sample_rows
+    if sample_rows >= population:
+        return [p, p]
+    n = sample_rows * (population - 1) / (population - sample_rows)
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return [max(0.0, center - half), min(1.0, center + half)]
+
+
+def gee_cardinality(counts, sample_rows, population):
+    """
+    Guaranteed-Error Estimator (Charikar et al.) of the number of distinct values, from the
+    sample's value counts. Values seen once may each stand for up to population/sample_rows
+    distinct values, values seen more often are assumed to be all there is; the range runs from
+    what was observed to that worst case.
+    """
+    distinct = len(counts)
+    if not sample_rows:
+        return 0, [0, 0]
+    singletons = int((counts == 1).sum())
+    ratio = population / sample_rows
+    estimate = round(math.sqrt(ratio) * singletons + distinct - singletons)
+    upper = min(population, round(ratio * singletons + distinct - singletons))
+    return estimate, [distinct, upper]
+
+
+def is_borderline(bounds, thresholds):
+    low, high = bounds
+    return low != high and any(low <= threshold <= high for threshold in thresholds)
+
+
+def profile_dataframe(df, top_k=PROFILE_TOP_K, sample_rows=PROFILE_SAMPLE_ROWS, thresholds=None, seed=None,
+                      population=None):
+    """
+    Profile every column of df. Null counts and numeric/datetime min/max are computed for all
+    columns at once; cardinality and top-k come from one value_counts per column.
+
+    Frames with more than sample_rows rows are profiled from a uniform random sample.
+    thresholds ({"cardinality": [...], "null_ratio": [...]}) are the values the planner compares
+    against; columns whose estimate's bounds contain one are profiled again on every row.
+    With population set, df already is a uniform sample of that many rows (see ReservoirSample)
+    and the whole profile is an estimate, as there are no other rows to re-profile from; see
+    refine_from_table for the borderline columns.
+    """
+    rows = len(df)
+    if population is not None and population > rows:
+        return {
+            "rows": population,
+            "exact": False,
+            "sample_rows": rows,
+            "exact_columns": [],
+            "columns": _profile_columns(df, top_k, population=population),
+        }
+    if not sample_rows or rows <= sample_rows:
+        return {"rows": rows, "exact": True, "sample_rows": None, "columns": _profile_columns(df, top_k)}
+
+    rng = np.random.default_rng(seed)
+    sample = df.take(np.sort(rng.choice(rows, size=sample_rows, replace=False)))
+    columns = _profile_columns(sample, top_k, population=rows)
+
+    borderline = borderline_columns(columns, thresholds)
+    if borderline:
+        exact = {column["name"]: column for column in _profile_columns(df[borderline], top_k)}
+        columns = [exact.get(column["name"], column) for column in columns]
+    return {
+        "rows": rows,
+        "exact": len(borderline) == len(columns),
+        "sample_rows": sample_rows,
+        "exact_columns": borderline,
+        "columns": columns,
+    }
+
+
+def borderline_columns(columns, thresholds):
+    thresholds = thresholds or {}
+    return [
+        column["name"] for column in columns
+        if is_borderline(column["cardinality_bounds"], thresholds.get("cardinality", []))
+        or is_borderline(column["null_ratio_bounds"], thresholds.get("null_ratio", []))
+    ]
+
+
+def refine_from_table(profile, engine, table_name, thresholds=None):
+    """
+    Make the borderline columns of a sampled profile exact from the table the rows were loaded
+    into: one query counts nulls and distinct values for all of them. Top-k counts stay estimates.
+    """
+    if profile["exact"]:
+        return profile
+    borderline = borderline_columns(profile["columns"], thresholds)
+    if not borderline:
+        return profile
+    quote = engine.dialect.identifier_preparer.quote
+    select = ["COUNT(*)"]
+    for name in borderline:
+        select += [f"COUNT({quote(name)})", f"COUNT(DISTINCT {quote(name)})"]
+    with engine.connect() as conn:
+        counts = conn.execute(text(f"SELECT {', '.join(select)} FROM {quote(table_name)}")).fetchone()
+    rows = counts[0]
+    exact = {}
+    for position, name in enumerate(borderline):
+        nulls = rows - counts[1 + 2 * position]
+        cardinality = counts[2 + 2 * position]
+        null_ratio = nulls / rows if rows else 0.0
+        exact[name] = {
+            "exact": True,
+            "nulls": nulls,
+            "null_ratio": null_ratio,
+            "null_ratio_bounds": [null_ratio, null_ratio],
+            "cardinality": cardinality,
+            "cardinality_bounds": [cardinality, cardinality],
+        }
+    columns = [dict(column, **exact[column["name"]]) if column["name"] in exact else column
+               for column in profile["columns"]]
+    return dict(profile, rows=rows, exact=len(borderline) == len(columns), exact_columns=borderline,
+                columns=columns)
+
+
+class ReservoirSample:
+    """
+    Uniform random sample of at most size rows from DataFrame chunks, kept as they stream past:
+    every row draws a random key and the size rows with the smallest keys are kept, in stream
+    order. rows counts every row seen, for profile_dataframe(frame(), population=rows).
+    """
+
+    def __init__(self, size=PROFILE_SAMPLE_ROWS, seed=None):
+        self.size = size
+        self.rows = 0
+        self._rng = np.random.default_rng(seed)
+        self._frame = None
+        self._keys = np.empty(0)
+
+    def add(self, df):
+        self.rows += len(df)
+        keys = self._rng.random(len(df))
+        if len(self._keys) >= self.size:
+            # Once full, only rows keyed below the largest kept key can get in
+            entering = keys < self._keys.max()
+            if not entering.any():
+                return
+            df, keys = df[entering], keys[entering]
+        frame = df if self._frame is None else pd.concat([self._frame, df], ignore_index=True)
+        keys = np.concatenate([self._keys, keys])
+        if len(keys) > self.size:
+            kept = np.sort(np.argpartition(keys, self.size)[:self.size])
+            frame, keys = frame.take(kept), keys[kept]
+        self._frame = frame.reset_index(drop=True)
+        self._keys = keys
+
+    def frame(self):
+        return self._frame
+
+
+def columns_of_kind(profile, kind):
+    return [column["name"] for column in profile["columns"] if column["kind"] == kind]
@@ -0,0 +1,235 @@
+"""
+Pre-aggregated rollup tables for the planned charts.
+
+Pies, bars, bubbles and the line/area time series only ever show aggregates, so after the load
+each distinct grouping they use (group-by columns plus the time column truncated to the day) is
+materialized once with a GROUP BY on the loaded table and registered as the charts' datasource.
+Dashboard views then read the rollup's rows instead of scanning the raw table. Every rollup is
+recorded in the ledger's derived_tables, so the ones a later plan no longer uses can be dropped.
+
+Measures are stored so that re-aggregating them gives the chart's original metric: SUM(x) is
+kept as x (the chart's SUM(x) label still applies), COUNT becomes a count column that the chart
+SUMs, and MAX stays a MAX. Histograms, box plots and the table chart need the raw rows.
+"""
+import copy
+import hashlib
+import json
+import os
+import time
+import pandas as pd
+from sqlalchemy import text
+from bulk_load import bulk_load_dataframe
+from db_engine import get_engine
+from ingest_ledger import derived_tables_of, forget_derived, is_derived_current, record_derived
+from profiler import DATETIME
+from table_swap import create_staging_table, drop_table, swap_in_staging_table
+
+# Rollups expected to be larger than this, or than ROLLUP_MAX_RATIO of the table, are not built
+ROLLUP_MAX_ROWS = int(os.environ.get("XRAY_ROLLUP_MAX_ROWS", 200000))
+ROLLUP_MAX_RATIO = 0.1
+ROLLUP_SUFFIX = "__rollup_"
+ROW_COUNT_COLUMN = "row_count"
+COUNT_SUFFIX = "__count"
+MAX_SUFFIX = "__max"
+
+# Day truncation per SQLAlchemy dialect; time series are not rolled up on other databases
+DAY_BUCKET_SQL = {
+    "sqlite": "date({})",
+    "postgresql": "date_trunc('day', {})",
+    "mysql": "DATE({})",
+    "mariadb": "DATE({})",
+    "oracle": "TRUNC({})",
+    "mssql": "CAST({} AS DATE)",
+}
+
+
+def chart_rollup(visualization, datetime_columns):
+    """
+    (group-by columns, time column or None, [(alias, aggregate, column)]) a planned chart can be
+    answered from, or None if it needs the raw rows.
+    """
+    viz_type = visualization.get("type")
+    if viz_type == "pie":
+        column = visualization["groupby"]
+        filters = visualization.get("adhoc_filters") or []
+        time_column = filters[0]["subject"] if filters and filters[0]["subject"] in datetime_columns else None
+        return [column], time_column, [(f"{column}{COUNT_SUFFIX}", "COUNT", column)]
+    if viz_type == "bar":
+        metric = visualization["metric"]["column"]["column_name"]
+        return [visualization["groupby"]], visualization.get("granularity_sqla"), [(metric, "SUM", metric)]
+    if viz_type in ("line", "area"):
+        return [], visualization["time_column"], [(ROW_COUNT_COLUMN, "COUNT", None)]
+    if viz_type == "bubble":
+        x_column, y_column, size = visualization["x_axis"], visualization["y_axis"], visualization["size"]
+        return [visualization["entity"]], None, [
+            (x_column, "SUM", x_column), (y_column, "SUM", y_column), (f"{size}{MAX_SUFFIX}", "MAX", size)
+        ]
+    return None
+
+
+def estimate_rows(rollup, columns):
+    """
+    Upper bound on the rollup's row count from the column profile: the product of the group-by
+    cardinalities (one more for a null group) and the number of days covered.
+    """
+    estimate = 1
+    for name in rollup["group_by"]:
+        column = columns[name]
+        estimate *= column["cardinality"] + (1 if column["nulls"] else 0)
+    if rollup["time_column"]:
+        column = columns[rollup["time_column"]]
+        days = column["cardinality"] + (1 if column["nulls"] else 0)
+        if column["min"] and column["max"]:
+            days = min(days, (pd.Timestamp(column["max"]) - pd.Timestamp(column["min"])).days + 2)
+        estimate *= days
+    return estimate
+
+
+def rollup_table_name(table_name, rollup):
+    spec = json.dumps([rollup["group_by"], rollup["time_column"], rollup["measures"]], sort_keys=True)
+    return f"{table_name}{ROLLUP_SUFFIX}{hashlib.sha256(spec.encode('utf-8')).hexdigest()[:8]}"
+
+
+def plan_rollups(visualizations, profile, table_name):
+    """
+    The rollups worth building for these charts: one per distinct grouping, with the measures of
+    every chart that uses it. Each is {"table", "group_by", "time_column", "measures",
+    "charts" (indexes into visualizations), "estimated_rows"}.
+    """
+    columns = {column["name"]: column for column in profile["columns"]}
+    datetime_columns = {name for name, column in columns.items() if column["kind"] == DATETIME}
+    rollups = {}
+    for index, visualization in enumerate(visualizations):
+        spec = chart_rollup(visualization, datetime_columns)
+        if spec is None:
+            continue
+        group_by, time_column, measures = spec
+        rollup = rollups.setdefault((tuple(group_by), time_column), {
+            "group_by": group_by,
+            "time_column": time_column,
+            "measures": {},
+            "charts": [],
+        })
+        for alias, aggregate, column in measures:
+            rollup["measures"][alias] = [aggregate, column]
+        rollup["charts"].append(index)
+
+    planned = []
+    for rollup in rollups.values():
+        rollup["estimated_rows"] = estimate_rows(rollup, columns)
+        if rollup["estimated_rows"] > min(ROLLUP_MAX_ROWS, profile["rows"] * ROLLUP_MAX_RATIO):
+            continue
+        rollup["table"] = rollup_table_name(table_name, rollup)
+        planned.append(rollup)
+    return planned
+
+
+def rollup_query(engine, source_table, rollup):
+    quote = engine.dialect.identifier_preparer.quote
+    select = [quote(column) for column in rollup["group_by"]]
+    group = list(select)
+    if rollup["time_column"]:
+        bucket = DAY_BUCKET_SQL[engine.dialect.name].format(quote(rollup["time_column"]))
+        select.append(f"{bucket} AS {quote(rollup['time_column'])}")
+        group.append(bucket)
+    for alias, (aggregate, column) in rollup["measures"].items():
+        select.append(f"{aggregate}({quote(column) if column else '*'}) AS {quote(alias)}")
+    query = f"SELECT {', '.join(select)} FROM {quote(source_table)}"
+    if group:
+        query += f" GROUP BY {', '.join(group)}"
+    return query
+
+
+def materialize_rollup(engine, source_table, rollup):
+    """
+    Aggregate source_table in the database and swap the result in as the rollup table.
+    """
+    with engine.connect() as conn:
+        df = pd.read_sql(text(rollup_query(engine, source_table, rollup)), conn)
+    if rollup["time_column"]:
+        df[rollup["time_column"]] = pd.to_datetime(df[rollup["time_column"]])
+    staging_name = create_staging_table(df, engine, rollup["table"])
+    try:
+        bulk_load_dataframe(df, engine, staging_name)
+        swap_in_staging_table(engine, staging_name, rollup["table"])
+    except Exception:
+        drop_table(engine, staging_name)
+        raise
+    return len(df)
+
+
+def materialize_rollups(db_connection_string, source_table, rollups):
+    """
+    Build the planned rollups that are not current for the table's latest load (see
+    ingest_ledger.is_derived_current). Returns the rollups that exist afterwards.
+    """
+    engine = get_engine(db_connection_string)
+    available = []
+    for rollup in rollups:
+        if rollup["time_column"] and engine.dialect.name not in DAY_BUCKET_SQL:
+            print(f"No day truncation for {engine.dialect.name}; charts on '{rollup['time_column']}' read "
+                  f"'{source_table}' directly.")
+            continue
+        if is_derived_current(db_connection_string, rollup["table"], source_table, engine):
+            available.append(rollup)
+            continue
+        start = time.perf_counter()
+        try:
+            rows = materialize_rollup(engine, source_table, rollup)
+        except Exception as e:
+            print(f"Failed to build rollup '{rollup['table']}': {e}")
+            continue
+        record_derived(db_connection_string, rollup["table"], source_table)
+        print(f"Rollup '{rollup['table']}' built: {rows} rows (estimated {rollup['estimated_rows']}) "
+              f"in {time.perf_counter() - start:.2f}s")
+        available.append(rollup)
+    return available
+
+
+def drop_stale_rollups(db_connection_string, source_table, rollups):
+    """
+    Drop the rollup tables recorded for source_table that are not among the planned rollups, e.g.
+    after the profile changed which charts are picked. Returns the dropped table names.
+    """
+    planned = {rollup["table"] for rollup in rollups}
+    stale = [name for name in derived_tables_of(db_connection_string, source_table)
+             if name.startswith(f"{source_table}{ROLLUP_SUFFIX}") and name not in planned]
+    if not stale:
+        return []
+    engine = get_engine(db_connection_string)
+    for name in stale:
+        drop_table(engine, name)
+        forget_derived(db_connection_string, name)
+        print(f"Rollup '{name}' is no longer planned for '{source_table}', dropped it.")
+    return stale
+
+
+def rollup_visualization(visualization, rollup):
+    """
+    The chart configuration for reading a visualization from its rollup table.
+    """
+    visualization = copy.deepcopy(visualization)
+    viz_type = visualization.get("type")
+    if viz_type == "pie":
+        metric = visualization["metric"]
+        metric["column"] = {"column_name": f"{visualization['groupby']}{COUNT_SUFFIX}"}
+        metric["aggregate"] = "SUM"
+    elif viz_type in ("line", "area"):
+        visualization["metrics"] = [{
+            "expressionType": "SIMPLE",
+            "column": {"column_name": ROW_COUNT_COLUMN},
+            "aggregate": "SUM",
+            "label": "count",
+        }]
+    elif viz_type == "bubble":
+        visualization["size"] = f"{visualization['size']}{MAX_SUFFIX}"
+    return visualization
+
+
+def rollup_profile(rollup):
+    """
+    Minimal column profile for the rollup's dataset, so its time column is marked temporal.
+    """
+    if not rollup["time_column"]:
+        return None
+    return {"columns": [{"name": rollup["time_column"], "kind": DATETIME}]}
@@ -0,0 +1,301 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from columnar import compile_converter
+from json_stream import JsonDatasetStream, DEFAULT_CHUNK_ROWS
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: builds are serialized with a byte-range lock instead of flock
+    fcntl = None
+    import msvcrt
+
+SIDECAR_SUFFIX = ".columnar"
+SIDECAR_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+# Each build writes datasets/code_review.columnar.v-<id>; code_review.columnar.current holds the
+# id of the current one and is swapped with os.replace, which is atomic on POSIX and Windows alike
+VERSION_INFIX = ".v-"
+POINTER_SUFFIX = ".current"
+CODES_DTYPE = np.int32
+
+
+def sidecar_dir(file_path):
+    """
+    datasets/code_review.json -> datasets/code_review.columnar, the prefix of the sidecar's
+    version directories and pointer file.
+    """
+    return os.path.splitext(file_path)[0] + SIDECAR_SUFFIX
+
+
+def _current_dir(target):
+    """
+    The version directory the pointer file names, or None before the first build.
+    """
+    try:
+        with open(target + POINTER_SUFFIX, 'r', encoding='utf-8') as pointer_file:
+            version = pointer_file.read().strip()
+    except OSError:
+        return None
+    return f"{target}{VERSION_INFIX}{version}" if version else None
+
+
+def _source_stamp(file_path):
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), 'r', encoding='utf-8') as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+
+def read_manifest(file_path):
+    directory = _current_dir(sidecar_dir(file_path))
+    return _read_manifest(directory) if directory else None
+
+
+def _is_current(manifest, file_path):
+    return (
+        manifest is not None
+        and manifest.get("version") == SIDECAR_VERSION
+        and manifest.get("source") == _source_stamp(file_path)
+    )
+
+
+def is_sidecar_current(file_path):
+    return _is_current(read_manifest(file_path), file_path)
+
+
+def _write_npy(npy_path, bin_path, dtype, rows):
+    """
+    Prefix the raw column bytes accumulated in bin_path with an .npy header.
+    """
+    with open(npy_path, 'wb') as npy_file:
+        np.lib.format.write_array_header_1_0(npy_file, {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+            "fortran_order": False,
+            "shape": (rows,),
+        })
+        with open(bin_path, 'rb') as bin_file:
+            shutil.copyfileobj(bin_file, npy_file)
+    os.remove(bin_path)
+
+
+@contextmanager
+def _build_lock(target):
+    """
+    Serialize the builds of one sidecar across processes; the lock is released on close.
+    """
+    with open(f"{target}.lock", 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+            return
+        lock_file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                time.sleep(0.1)
+        try:
+            yield
+        finally:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def build_sidecar(file_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Build the sidecar unless it is current, e.g. because another process built it while this
+    one waited for the build lock; returns the manifest.
+    """
+    target = sidecar_dir(file_path)
+    with _build_lock(target):
+        manifest = read_manifest(file_path)
+        if _is_current(manifest, file_path):
+            return manifest
+        return _write_version(file_path, target, chunk_rows)
+
+
+def _write_version(file_path, target, chunk_rows):
+    """
+    Stream the JSON dataset once and write one .npy file per column plus a manifest.
+    String columns are dictionary-encoded into int32 codes (-1 for null) and a JSON dictionary.
+    The files go into a new version directory, which the pointer file is then switched to.
+    """
+    stamp = _source_stamp(file_path)
+    build_id = uuid.uuid4().hex[:8]
+    build_dir = f"{target}{VERSION_INFIX}{build_id}"
+    pointer = target + POINTER_SUFFIX
+    new_pointer = f"{pointer}.tmp-{build_id}"
+    replaced = None
+    os.makedirs(build_dir)
+
+    try:
+        with JsonDatasetStream(file_path, chunk_rows=chunk_rows) as stream:
+            converter = compile_converter(stream.schema)
+            columns = []
+            dictionaries = []
+            bin_files = []
+            for position, col in enumerate(converter.schema):
+                encoded = col['dataType'] == "string"
+                columns.append({
+                    "colName": col['colName'],
+                    "dataType": col['dataType'],
+                    "file": f"{position}.codes.npy" if encoded else f"{position}.npy",
+                    "dictionary": f"{position}.dict.json" if encoded else None,
+                    "dtype": None,
+                })
+                dictionaries.append({} if encoded else None)
+                bin_files.append(open(os.path.join(build_dir, f"{position}.bin"), 'wb'))
+
+            rows = 0
+            try:
+                for chunk in stream.iter_chunks():
+                    df = converter(chunk)
+                    for position, column in enumerate(columns):
+                        values = df[column["colName"]]
+                        dictionary = dictionaries[position]
+                        if dictionary is not None:
+                            chunk_codes, uniques = pd.factorize(values, use_na_sentinel=True)
+                            global_ids = np.array(
+                                [dictionary.setdefault(value, len(dictionary)) for value in uniques] + [-1],
+                                dtype=CODES_DTYPE
+                            )
+                            # factorize marks nulls with -1, which picks the trailing -1 above
+                            array = global_ids[chunk_codes]
+                        else:
+                            array = values.to_numpy()
+                        column["dtype"] = np.lib.format.dtype_to_descr(array.dtype)
+                        bin_files[position].write(np.ascontiguousarray(array).tobytes())
+                    rows += len(df)
+            finally:
+                for bin_file in bin_files:
+                    bin_file.close()
+
+            for position, column in enumerate(columns):
+                if column["dtype"] is None:
+                    empty = converter([])[column["colName"]].to_numpy()
+                    column["dtype"] = np.lib.format.dtype_to_descr(
+                        np.dtype(CODES_DTYPE) if dictionaries[position] is not None else empty.dtype
+                    )
+                _write_npy(
+                    os.path.join(build_dir, column["file"]),
+                    os.path.join(build_dir, f"{position}.bin"),
+                    np.lib.format.descr_to_dtype(column["dtype"]),
+                    rows
+                )
+                if dictionaries[position] is not None:
+                    with open(os.path.join(build_dir, column["dictionary"]), 'w', encoding='utf-8') as dict_file:
+                        json.dump(list(dictionaries[position]), dict_file)
+
+            manifest = {
+                "version": SIDECAR_VERSION,
+                "name": stream.name,
+                "schema": stream.schema,
+                "rows": rows,
+                "source": stamp,
+                "columns": columns,
+            }
+        with open(os.path.join(build_dir, MANIFEST_NAME), 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+
+        # Repoint readers with one atomic rename over the pointer file, so there is always a
+        # complete sidecar
+        replaced = _current_dir(target)
+        with open(new_pointer, 'w', encoding='utf-8') as pointer_file:
+            pointer_file.write(build_id)
+        os.replace(new_pointer, pointer)
+    except Exception:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        if os.path.exists(new_pointer):
+            os.remove(new_pointer)
+        raise
+    _remove_old_versions(target, keep=[build_dir, replaced])
+    # Sidecars from before versioning lived at target itself (a directory, later a symlink)
+    if os.path.islink(target):
+        os.remove(target)
+    elif os.path.isdir(target):
+        shutil.rmtree(target, ignore_errors=True)
+
+    print(f"Columnar sidecar for '{file_path}' written to '{build_dir}' ({rows} rows).")
+    return manifest
+
+
+def _remove_old_versions(target, keep):
+    """
+    Delete the versions other than keep, under the build lock. The version a build replaced is
+    kept until the next build, for readers that read the pointer just before the swap. A version
+    still memory-mapped on Windows cannot be deleted yet and is retried by the next build.
+    """
+    parent = os.path.dirname(target) or "."
+    prefix = os.path.basename(target) + VERSION_INFIX
+    keep = {os.path.realpath(path) for path in keep if path}
+    for name in os.listdir(parent):
+        path = os.path.realpath(os.path.join(parent, name))
+        if name.startswith(prefix) and path not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _current_version(file_path):
+    """
+    (directory, manifest) of the current sidecar version, rebuilt if missing or older than its
+    source file. The pointer is read once, so a swap in between cannot mix two versions.
+    """
+    target = sidecar_dir(file_path)
+    directory = _current_dir(target)
+    manifest = _read_manifest(directory) if directory else None
+    if not _is_current(manifest, file_path):
+        build_sidecar(file_path)
+        directory = _current_dir(target)
+        manifest = _read_manifest(directory) if directory else None
+        if manifest is None:
+            raise OSError(f"Columnar sidecar for '{file_path}' was replaced while it was being opened")
+    return directory, manifest
+
+
+def ensure_sidecar(file_path):
+    """
+    Rebuild the sidecar if it is missing or older than its source file; returns the manifest.
+    """
+    return _current_version(file_path)[1]
+
+
+def open_sidecar(file_path):
+    """
+    Open a dataset's sidecar as a DataFrame. Numeric and date columns are memory-mapped, so
+    opening is near-instant and the pages are shared by every process reading the same file.
+    """
+    directory, manifest = _current_version(file_path)
+    data = {}
+    for column in manifest["columns"]:
+        # A plain ndarray view over the map, so pandas never sees the memmap subclass
+        array = np.load(os.path.join(directory, column["file"]), mmap_mode='r').view(np.ndarray)
+        if column["dictionary"]:
+            with open(os.path.join(directory, column["dictionary"]), 'r', encoding='utf-8') as dict_file:
+                dictionary = json.load(dict_file)
+            values = np.empty(len(dictionary) + 1, dtype=object)
+            values[:-1] = dictionary
+            values[-1] = None
+            array = values.take(array)
+        data[column["colName"]] = array
+    columns = [column["colName"] for column in manifest["columns"]]
+    # copy=False keeps each column as its own block, i.e. backed directly by the memory map
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+
+if __name__ == '__main__':
+    import sys
+    for path in sys.argv[1:]:
+        ensure_sidecar(path)
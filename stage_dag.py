@@ -0,0 +1,128 @@
+"""
+Minimal dependency-graph executor for pipeline stages.
+
+Each stage starts as soon as all the stages it depends on have finished, so independent work
+(e.g. Superset calls and the database load) overlaps and the wall-clock time approaches the
+critical path. Per-stage start offsets and durations are recorded.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class Stage:
+    """
+    func(results) receives stage results keyed by stage name; it may only read the stages listed
+    in depends_on. progress is the percentage reported when the stage starts and ends.
+    """
+
+    def __init__(self, name, func, depends_on=(), progress=0):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.progress = progress
+
+
+def critical_path(timings):
+    """
+    Longest chain of dependent stage durations: (seconds, [stage names]).
+    """
+    by_name = {timing["stage"]: timing for timing in timings}
+    memo = {}
+
+    def longest(name):
+        if name not in memo:
+            timing = by_name[name]
+            best = max((longest(dep) for dep in timing["depends_on"] if dep in by_name),
+                       key=lambda path: path[0], default=(0, []))
+            memo[name] = (best[0] + (timing["seconds"] or 0), best[1] + [name])
+        return memo[name]
+
+    return max((longest(name) for name in by_name), key=lambda path: path[0], default=(0, []))
+
+
+def run_stages(stages, progress_callback=None, max_workers=None, label="pipeline"):
+    """
+    Run the stages with maximum overlap and return (results, timings).
+    A stage's result is dropped once every stage depending on it has finished, so large
+    intermediates can be freed early; the returned results hold the stages nothing depends on.
+    If a stage raises, no new stages start; the error is re-raised once the running ones finish.
+    progress_callback(stage, percent, stages=timings) is called whenever a stage starts or ends.
+    """
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.depends_on if dep not in names]
+        if missing:
+            raise Exception(f"Stage '{stage.name}' depends on unknown stage(s): {', '.join(missing)}")
+
+    start = time.time()
+    results = {}
+    finished = set()
+    dependents = {stage.name: {other.name for other in stages if stage.name in other.depends_on} for stage in stages}
+    timings = {}
+    lock = threading.Lock()
+    pending = list(stages)
+    running = {}
+    error = None
+
+    def snapshot():
+        with lock:
+            return [dict(timing) for timing in timings.values()]
+
+    def report(stage, progress):
+        if progress_callback:
+            progress_callback(stage.name, progress, stages=snapshot())
+
+    def run(stage):
+        with lock:
+            timings[stage.name] = {
+                "stage": stage.name,
+                "depends_on": list(stage.depends_on),
+                "started_at": time.time(),
+                "offset": round(time.time() - start, 3),
+                "seconds": None,
+            }
+        report(stage, stage.progress)
+        try:
+            return stage.func(results)
+        finally:
+            with lock:
+                timing = timings[stage.name]
+                timing["seconds"] = round(time.time() - timing["started_at"], 3)
+            report(stage, stage.progress)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages), thread_name_prefix="xray-stage") as executor:
+        while True:
+            if error is None:
+                for stage in [s for s in pending if all(dep in finished for dep in s.depends_on)]:
+                    pending.remove(stage)
+                    running[executor.submit(run, stage)] = stage
+            if not running:
+                if error is None and pending:
+                    raise Exception(f"Stages {[stage.name for stage in pending]} can never run (dependency cycle)")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name] = future.result()
+                    finished.add(stage.name)
+                except Exception as e:
+                    error = error or e
+                for dep in stage.depends_on:
+                    if dependents[dep] <= finished:
+                        results.pop(dep, None)
+
+    timing_list = sorted(snapshot(), key=lambda timing: timing["offset"])
+    print_timings(label, timing_list, time.time() - start)
+    if error is not None:
+        raise error
+    return results, timing_list
+
+
+def print_timings(label, timings, wall_seconds):
+    critical_seconds, path = critical_path(timings)
+    print(f"{label}: {wall_seconds:.2f}s wall, {critical_seconds:.2f}s critical path ({' -> '.join(path)})")
+    for timing in timings:
+        seconds = f"{timing['seconds']:.3f}s" if timing["seconds"] is not None else "-"
+        print(f"  {timing['stage']:<14} +{timing['offset']:.3f}s  {seconds}")
@@ -0,0 +1,29 @@
+import os
+import sqlite3
+
+# Local SQLite file holding the pipeline's bookkeeping (ingest ledger, caches, indexes)
+STATE_DB_PATH = os.environ.get(
+    "XRAY_STATE_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "xray_state.db")
+)
+
+
+def get_state_connection():
+    conn = sqlite3.connect(STATE_DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_state():
+    """
+    Create (or migrate) every bookkeeping table. Entry points call this once at startup, before
+    the first build; importing the modules that use the tables does not touch the state file.
+    """
+    from dashboard_registry import init_registry
+    from dataset_index import init_dataset_index
+    from ingest_ledger import init_ledger
+    from plan_cache import init_plan_cache
+    init_ledger()
+    init_plan_cache()
+    init_registry()
+    init_dataset_index()
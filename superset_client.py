@@ -0,0 +1,389 @@
+import base64
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
+
+SUPERSET_BASE_URL = "http://localhost:8088"
+USERNAME = "admin"
+PASSWORD = "admin"
+
+# Connections kept open to Superset; sized to the chart-creation fan-out
+CHART_CONCURRENCY = 20
+# Superset's default JWT_ACCESS_TOKEN_EXPIRES, used when a token carries no readable exp claim
+DEFAULT_TOKEN_TTL = 15 * 60
+# Renew tokens this many seconds before they actually expire
+TOKEN_EXPIRY_MARGIN = 30
+
+SUPERSET_REQUEST_TIMEOUT = float(os.environ.get("XRAY_SUPERSET_TIMEOUT", 30))
+# Retries after the first attempt. GET/PUT/DELETE are retried on errors, timeouts and
+# RETRY_STATUSES; POST only when Superset cannot have acted on it (connect timeout, 429, 503)
+SUPERSET_MAX_RETRIES = int(os.environ.get("XRAY_SUPERSET_MAX_RETRIES", 3))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+POST_RETRY_STATUSES = {429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 10.0
+# GETs still unanswered after this many seconds get a duplicate request; the first answer wins
+SUPERSET_HEDGE_READS = os.environ.get("XRAY_SUPERSET_HEDGE_READS", "0") == "1"
+SUPERSET_HEDGE_DELAY = float(os.environ.get("XRAY_SUPERSET_HEDGE_DELAY", 0.5))
+# The breaker opens when at least BREAKER_FAILURE_RATIO of the last BREAKER_WINDOW calls
+# (and at least BREAKER_MIN_CALLS) failed, then lets one trial call through after BREAKER_RESET_SECONDS
+BREAKER_WINDOW = 20
+BREAKER_MIN_CALLS = 10
+BREAKER_FAILURE_RATIO = 0.5
+BREAKER_RESET_SECONDS = float(os.environ.get("XRAY_SUPERSET_BREAKER_RESET_SECONDS", 15))
+
+
+def jwt_expiry(token, default_ttl=DEFAULT_TOKEN_TTL):
+    """
+    Read the exp claim of a JWT without verifying it; falls back to now + default_ttl.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return time.time() + default_ttl
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def backoff_delay(attempt, response=None, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """
+    Seconds to wait before retry number attempt + 1: Retry-After when the response carries one,
+    otherwise exponential backoff with full jitter.
+    """
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), cap)
+            except ValueError:
+                pass
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """
+    Raised instead of sending a request while Superset is considered unhealthy.
+    """
+
+
+class CircuitBreaker:
+    """
+    closed -> open when too many recent calls failed; open -> half_open after reset_seconds;
+    half_open lets a single trial call through and closes on its success or reopens on failure.
+    """
+
+    def __init__(self, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+                 failure_ratio=BREAKER_FAILURE_RATIO, reset_seconds=BREAKER_RESET_SECONDS):
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def _open(self):
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.opened += 1
+
+    def record(self, success):
+        with self._lock:
+            if self.state == "half_open":
+                self._trial_in_flight = False
+                if success:
+                    self.state = "closed"
+                else:
+                    self._open()
+            elif self.state == "closed":
+                self._outcomes.append(success)
+                failures = self._outcomes.count(False)
+                calls = len(self._outcomes)
+                if calls >= self.min_calls and failures >= self.failure_ratio * calls:
+                    self._open()
+                    print(f"Superset circuit breaker opened ({failures}/{calls} recent calls failed)")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": self._outcomes.count(False),
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+class SupersetClient:
+    """
+    Thread-safe Superset API client sharing one pooled requests.Session.
+
+    The access token and CSRF token are cached until shortly before the access token expires and
+    are then renewed with the refresh token (falling back to a full login). A 401 response clears
+    the cached tokens and the request is retried once.
+
+    Every request also goes through a circuit breaker, is retried with jittered backoff when
+    that is safe for its method, and GETs can be hedged with a duplicate when slow.
+    """
+
+    def __init__(self, base_url=SUPERSET_BASE_URL, username=USERNAME, password=PASSWORD,
+                 pool_size=CHART_CONCURRENCY, hedge_reads=SUPERSET_HEDGE_READS):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._access_token = None
+        self._access_expires_at = 0
+        self._refresh_token = None
+        self._refresh_expires_at = 0
+        self._csrf_token = None
+        self.logins = 0
+        self.refreshes = 0
+        self.hedge_reads = hedge_reads
+        self.breaker = CircuitBreaker()
+        # Room for a primary and a hedge per pooled connection, so no hedged call waits for a worker
+        # and the hedge timer only ever runs on requests that were actually sent
+        self._hedge_pool = ThreadPoolExecutor(max_workers=2 * pool_size, thread_name_prefix="superset-hedge")
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def url(self, path_or_url):
+        if path_or_url.startswith("http://") or path_or_url.startswith("https://"):
+            return path_or_url
+        return f"{self.base_url}/{path_or_url.lstrip('/')}"
+
+    def _login(self):
+        login_data = {
+            "username": self.username,
+            "password": self.password,
+            "provider": "db",
+            "refresh": True
+        }
+        # These run under the token lock, so a hung auth call must not block every other request
+        response = self.session.post(self.url("/api/v1/security/login"), json=login_data,
+                                     timeout=SUPERSET_REQUEST_TIMEOUT)
+        if response.status_code != 200:
+            raise Exception("Authentication failed")
+        tokens = response.json()
+        self._access_token = tokens.get("access_token")
+        self._access_expires_at = jwt_expiry(self._access_token)
+        self._refresh_token = tokens.get("refresh_token")
+        self._refresh_expires_at = jwt_expiry(self._refresh_token) if self._refresh_token else 0
+        self.logins += 1
+
+    def _refresh(self):
+        response = self.session.post(
+            self.url("/api/v1/security/refresh"),
+            headers={"Authorization": f"Bearer {self._refresh_token}"},
+            timeout=SUPERSET_REQUEST_TIMEOUT
+        )
+        if response.status_code != 200:
+            return False
+        self._access_token = response.json().get("access_token")
+        self._access_expires_at = jwt_expiry(self._access_token)
+        self.refreshes += 1
+        return True
+
+    def _fetch_csrf_token(self):
+        response = self.session.get(
+            self.url("/api/v1/security/csrf_token/"),
+            headers={"Authorization": f"Bearer {self._access_token}"},
+            timeout=SUPERSET_REQUEST_TIMEOUT
+        )
+        if response.status_code != 200:
+            raise Exception("Failed to retrieve CSRF token")
+        self._csrf_token = response.json().get("result")
+
+    def _ensure_tokens(self):
+        now = time.time() + TOKEN_EXPIRY_MARGIN
+        if self._access_token and now < self._access_expires_at and self._csrf_token:
+            return
+        renewed = False
+        if self._access_token and self._refresh_token and now < self._refresh_expires_at:
+            renewed = self._refresh()
+        if not renewed:
+            self._login()
+        self._fetch_csrf_token()
+
+    def headers(self):
+        """
+        Request headers with a valid access token and CSRF token, logging in only when needed.
+        """
+        with self._lock:
+            self._ensure_tokens()
+            return {
+                "Authorization": f"Bearer {self._access_token}",
+                "X-CSRFToken": self._csrf_token,
+                "Content-Type": "application/json",
+                "Referer": self.base_url,
+            }
+
+    def invalidate(self):
+        with self._lock:
+            self._access_token = None
+            self._csrf_token = None
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _send(self, method, path_or_url, headers, **kwargs):
+        for attempt in range(2):
+            request_headers = self.headers()
+            if headers:
+                request_headers.update(headers)
+            response = self.session.request(method, self.url(path_or_url), headers=request_headers, **kwargs)
+            if response.status_code != 401 or attempt:
+                return response
+            self.invalidate()
+        return response
+
+    def _send_hedged(self, method, path_or_url, headers, **kwargs):
+        primary = self._hedge_pool.submit(self._send, method, path_or_url, headers, **kwargs)
+        done, _ = wait([primary], timeout=SUPERSET_HEDGE_DELAY)
+        if done:
+            return primary.result()
+        self._count("hedges")
+        hedge = self._hedge_pool.submit(self._send, method, path_or_url, headers, **kwargs)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.RequestException as e:
+                    error = e
+                    continue
+                if future is hedge:
+                    self._count("hedge_wins")
+                for loser in pending:
+                    # Not started yet: never sent. Already sent: its response is closed unread.
+                    if not loser.cancel():
+                        loser.add_done_callback(_close_response)
+                return response
+        raise error
+
+    def request(self, method, path_or_url, headers=None, retries=None, hedge=None, **kwargs):
+        """
+        Send a request with auth headers. retries and hedge override the client defaults
+        for this call; callers with their own retry loop pass retries=0.
+        """
+        method = method.upper()
+        kwargs.setdefault("timeout", SUPERSET_REQUEST_TIMEOUT)
+        retries = SUPERSET_MAX_RETRIES if retries is None else retries
+        hedge = (self.hedge_reads if hedge is None else hedge) and method == "GET"
+        idempotent = method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Superset circuit breaker is open, not sending {method} {path_or_url}")
+            self._count("requests")
+            response = error = None
+            try:
+                if hedge:
+                    response = self._send_hedged(method, path_or_url, headers, **kwargs)
+                else:
+                    response = self._send(method, path_or_url, headers, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            except Exception:
+                # e.g. login or CSRF refused; a half-open trial must still be settled
+                self.breaker.record(False)
+                raise
+            failed = error is not None or response.status_code in RETRY_STATUSES
+            self.breaker.record(not failed)
+            if not failed:
+                return response
+
+            if idempotent:
+                retryable = True
+            elif error is not None:
+                retryable = isinstance(error, requests.ConnectTimeout)
+            else:
+                retryable = response.status_code in POST_RETRY_STATUSES
+            if not retryable or attempt >= retries:
+                if error is not None:
+                    raise error
+                return response
+            self._count("retries")
+            time.sleep(backoff_delay(attempt, response))
+            attempt += 1
+
+    def get(self, path_or_url, **kwargs):
+        return self.request("GET", path_or_url, **kwargs)
+
+    def post(self, path_or_url, **kwargs):
+        return self.request("POST", path_or_url, **kwargs)
+
+    def put(self, path_or_url, **kwargs):
+        return self.request("PUT", path_or_url, **kwargs)
+
+    def delete(self, path_or_url, **kwargs):
+        return self.request("DELETE", path_or_url, **kwargs)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = {
+                "logins": self.logins,
+                "refreshes": self.refreshes,
+                "requests": self.requests,
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
+        stats["breaker"] = self.breaker.stats()
+        return stats
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_superset_client(base_url=SUPERSET_BASE_URL, username=USERNAME, password=PASSWORD):
+    """
+    Process-wide client per (base_url, username), shared by every request and thread.
+    """
+    key = (base_url, username)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None or client.password != password:
+            client = SupersetClient(base_url, username, password)
+            _clients[key] = client
+        return client
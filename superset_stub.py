@@ -0,0 +1,182 @@
+"""
+Local stand-in for the Superset endpoints used by the import build mode, for offline testing.
+
+Implements login/refresh/CSRF, database lookup, POST /api/v1/dashboard/import/ (the bundle is
+unpacked and checked the way Superset resolves it: every chart's dataset and every chart in
+the dashboard layout must be in the bundle), dashboard lookup by id or slug, the dashboard's
+datasets, dataset refresh and the embedded endpoint. GET /stub/calls lists the requests seen.
+
+Usage: python superset_stub.py [port]
+  XRAY_BUILD_MODE=import and point SUPERSET_BASE_URL at the stub.
+"""
+import base64
+import io
+import itertools
+import json
+import sys
+import threading
+import time
+import zipfile
+from flask import Flask, jsonify, request
+
+try:
+    import yaml
+
+    def parse_yaml(text):
+        return yaml.safe_load(text)
+except ImportError:
+    # Bundles written by import_bundle.py are JSON, which is also valid YAML
+    parse_yaml = json.loads
+
+app = Flask(__name__)
+_ids = itertools.count(1)
+_lock = threading.Lock()
+databases = {1: {"id": 1, "uuid": "00000000-0000-0000-0000-000000000001", "database_name": "examples",
+                 "sqlalchemy_uri": "sqlite:///examples.db"}}
+datasets = {}
+charts = {}
+dashboards = {}
+calls = []
+
+
+def _token(kind, ttl=300):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": int(time.time()) + ttl}).encode()).decode().rstrip("=")
+    return f"stub.{payload}.{kind}"
+
+
+@app.before_request
+def record_call():
+    with _lock:
+        calls.append([request.method, request.path])
+
+
+@app.route("/api/v1/security/login", methods=["POST"])
+def login():
+    return {"access_token": _token("access"), "refresh_token": _token("refresh", 3600)}
+
+
+@app.route("/api/v1/security/refresh", methods=["POST"])
+def refresh():
+    return {"access_token": _token("access")}
+
+
+@app.route("/api/v1/security/csrf_token/")
+def csrf_token():
+    return {"result": "stub-csrf"}
+
+
+@app.route("/api/v1/security/guest_token/", methods=["POST"])
+def guest_token():
+    return {"token": _token("guest")}
+
+
+@app.route("/api/v1/database/<int:database_id>")
+def get_database(database_id):
+    if database_id not in databases:
+        return {"message": "Not found"}, 404
+    return {"id": database_id, "result": databases[database_id]}
+
+
+def _by_uuid(objects, object_uuid):
+    for object_id, obj in objects.items():
+        if obj["uuid"] == object_uuid:
+            return object_id
+    return None
+
+
+@app.route("/api/v1/dashboard/import/", methods=["POST"])
+def import_dashboard():
+    upload = request.files.get("formData")
+    if upload is None:
+        return {"message": "formData is required"}, 400
+    overwrite = request.form.get("overwrite") == "true"
+    try:
+        with zipfile.ZipFile(io.BytesIO(upload.read())) as bundle:
+            contents = {}
+            for name in bundle.namelist():
+                # Strip the export's root directory
+                contents[name.split("/", 1)[1]] = parse_yaml(bundle.read(name).decode("utf-8"))
+    except (zipfile.BadZipFile, IndexError, ValueError) as e:
+        return {"message": f"Invalid bundle: {e}"}, 422
+
+    metadata = contents.get("metadata.yaml") or {}
+    if metadata.get("type") != "Dashboard":
+        return {"message": "metadata.yaml must declare type Dashboard"}, 422
+    bundle_databases = {c["uuid"] for n, c in contents.items() if n.startswith("databases/")}
+    bundle_datasets = {c["uuid"]: c for n, c in contents.items() if n.startswith("datasets/")}
+    bundle_charts = {c["uuid"]: c for n, c in contents.items() if n.startswith("charts/")}
+    bundle_dashboards = [c for n, c in contents.items() if n.startswith("dashboards/")]
+
+    for dataset in bundle_datasets.values():
+        if dataset["database_uuid"] not in bundle_databases:
+            return {"message": f"Dataset {dataset['table_name']} references a database not in the bundle"}, 422
+    for chart in bundle_charts.values():
+        if chart["dataset_uuid"] not in bundle_datasets:
+            return {"message": f"Chart {chart['slice_name']} references a dataset not in the bundle"}, 422
+    for dashboard in bundle_dashboards:
+        for node in dashboard["position"].values():
+            if isinstance(node, dict) and node.get("type") == "CHART" and node["meta"]["uuid"] not in bundle_charts:
+                return {"message": f"Dashboard layout references unknown chart {node['meta']['uuid']}"}, 422
+
+    with _lock:
+        for objects, configs in ((datasets, bundle_datasets.values()), (charts, bundle_charts.values())):
+            for config in configs:
+                if _by_uuid(objects, config["uuid"]) is None:
+                    objects[next(_ids)] = config
+        for dashboard in bundle_dashboards:
+            existing = _by_uuid(dashboards, dashboard["uuid"])
+            if existing is not None and not overwrite:
+                return {"message": "Dashboard already exists and overwrite is false"}, 422
+            dashboards[existing if existing is not None else next(_ids)] = dashboard
+    return {"message": "OK"}
+
+
+def _find_dashboard(id_or_slug):
+    for dashboard_id, dashboard in dashboards.items():
+        if str(dashboard_id) == id_or_slug or dashboard.get("slug") == id_or_slug:
+            return dashboard_id, dashboard
+    return None, None
+
+
+@app.route("/api/v1/dashboard/<id_or_slug>")
+def get_dashboard(id_or_slug):
+    dashboard_id, dashboard = _find_dashboard(id_or_slug)
+    if dashboard is None:
+        return {"message": "Not found"}, 404
+    return {"id": dashboard_id, "result": dict(dashboard, id=dashboard_id)}
+
+
+@app.route("/api/v1/dashboard/<id_or_slug>/datasets")
+def get_dashboard_datasets(id_or_slug):
+    dashboard_id, dashboard = _find_dashboard(id_or_slug)
+    if dashboard is None:
+        return {"message": "Not found"}, 404
+    chart_uuids = {node["meta"]["uuid"] for node in dashboard["position"].values()
+                   if isinstance(node, dict) and node.get("type") == "CHART"}
+    dataset_uuids = {charts[_by_uuid(charts, chart_uuid)]["dataset_uuid"] for chart_uuid in chart_uuids}
+    return {"result": [dict(datasets[_by_uuid(datasets, dataset_uuid)], id=_by_uuid(datasets, dataset_uuid))
+                       for dataset_uuid in sorted(dataset_uuids)]}
+
+
+@app.route("/api/v1/dataset/<int:dataset_id>/refresh", methods=["PUT"])
+def refresh_dataset(dataset_id):
+    if dataset_id not in datasets:
+        return {"message": "Not found"}, 404
+    return {"message": "OK"}
+
+
+@app.route("/api/v1/dashboard/<int:dashboard_id>/embedded", methods=["POST"])
+def embed_dashboard(dashboard_id):
+    if dashboard_id not in dashboards:
+        return {"message": "Not found"}, 404
+    return {"result": {"uuid": dashboards[dashboard_id]["uuid"]}}
+
+
+@app.route("/stub/calls")
+def get_calls():
+    with _lock:
+        return jsonify(calls)
+
+
+if __name__ == "__main__":
+    app.run(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8088, threaded=True)
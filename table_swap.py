@@ -0,0 +1,137 @@
+import os
+import re
+import threading
+import time
+import uuid
+from sqlalchemy import inspect, text
+from sqlalchemy.types import Text
+
+STAGING_SUFFIX = "__stg_"
+RETIRED_SUFFIX = "__old_"
+# MySQL can only index a prefix of TEXT columns
+MYSQL_INDEX_PREFIX_LENGTH = 191
+# Dialects that cannot index TEXT/CLOB columns at all
+NO_TEXT_INDEX_DIALECTS = {"oracle", "mssql"}
+# Staging tables older than this (seconds) are left over from a load that died before its swap
+STAGING_MAX_AGE = int(os.environ.get("XRAY_STAGING_MAX_AGE", 24 * 3600))
+
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def drop_stale_staging_tables(engine, table_name):
+    """
+    Drop the staging tables of table_name that loads which crashed before their swap left behind.
+    Staging names carry their creation time (8 hex digits of the epoch second, then 4 random
+    ones), so the staging table of a load still running is kept. Names with only the 8 random
+    digits of earlier versions always count as stale.
+    """
+    pattern = re.compile(re.escape(f"{table_name}{STAGING_SUFFIX}") + r"([0-9a-f]{8})([0-9a-f]{4})?")
+    now = time.time()
+    for name in inspect(engine).get_table_names():
+        match = pattern.fullmatch(name)
+        if not match or (match.group(2) and now - int(match.group(1), 16) < STAGING_MAX_AGE):
+            continue
+        try:
+            drop_table(engine, name)
+            print(f"Stale staging table '{name}' dropped.")
+        except Exception as e:
+            print(f"Failed to drop stale staging table '{name}': {e}")
+
+
+def create_staging_table(df, engine, table_name):
+    """
+    Create an empty, uniquely named staging table with the DataFrame's schema and return its name,
+    after dropping the stale staging tables of earlier loads.
+    """
+    drop_stale_staging_tables(engine, table_name)
+    staging_name = f"{table_name}{STAGING_SUFFIX}{int(time.time()):08x}{uuid.uuid4().hex[:4]}"
+    df.head(0).to_sql(staging_name, con=engine, if_exists='fail', index=False)
+    print(f"Staging table '{staging_name}' created.")
+    return staging_name
+
+
+def create_indexes(engine, staging_name, columns):
+    """
+    Create one secondary index per column on a loaded staging table, before it is swapped in, so
+    the rows are indexed in bulk rather than one insert at a time. Index names carry the staging
+    table's unique suffix, so they never clash with the indexes of the table being replaced.
+    Returns (indexed columns, seconds); a failing index is reported and skipped.
+    """
+    start = time.perf_counter()
+    table_name, suffix = staging_name.rsplit(STAGING_SUFFIX, 1)
+    types = {column["name"]: column["type"] for column in inspect(engine).get_columns(staging_name)}
+    indexed = []
+    for position, column in enumerate(columns):
+        if column not in types:
+            continue
+        key = _quote(engine, column)
+        if isinstance(types[column], Text):
+            if engine.dialect.name in NO_TEXT_INDEX_DIALECTS:
+                print(f"Column '{column}' is a text/CLOB column; {engine.dialect.name} cannot index it.")
+                continue
+            if engine.dialect.name == "mysql":
+                key = f"{key}({MYSQL_INDEX_PREFIX_LENGTH})"
+        index_name = _quote(engine, f"ix_{table_name[:40]}_{suffix}_{position}")
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"CREATE INDEX {index_name} ON {_quote(engine, staging_name)} ({key})"))
+            indexed.append(column)
+        except Exception as e:
+            print(f"Failed to index '{column}' of '{staging_name}': {e}")
+    return indexed, time.perf_counter() - start
+
+
+def swap_in_staging_table(engine, staging_name, table_name):
+    """
+    Replace table_name with the fully loaded staging table in one step, so readers always see
+    either the old or the new complete table. Returns the name the old table was moved to, if any.
+    """
+    retired_name = None
+    if inspect(engine).has_table(table_name):
+        retired_name = f"{table_name}{RETIRED_SUFFIX}{uuid.uuid4().hex[:8]}"
+
+    target = _quote(engine, table_name)
+    staging = _quote(engine, staging_name)
+    with engine.begin() as conn:
+        if engine.dialect.name == "mysql":
+            # A multi-table RENAME TABLE is atomic in MySQL
+            if retired_name:
+                conn.execute(text(f"RENAME TABLE {target} TO {_quote(engine, retired_name)}, {staging} TO {target}"))
+            else:
+                conn.execute(text(f"RENAME TABLE {staging} TO {target}"))
+        else:
+            # Both renames run in one transaction; atomic where DDL is transactional (e.g. PostgreSQL)
+            if retired_name:
+                conn.execute(text(f"ALTER TABLE {target} RENAME TO {_quote(engine, retired_name)}"))
+            conn.execute(text(f"ALTER TABLE {staging} RENAME TO {target}"))
+    print(f"Table '{staging_name}' swapped in as '{table_name}'.")
+
+    drop_retired_tables_in_background(engine, table_name)
+    return retired_name
+
+
+def drop_table(engine, table_name):
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {_quote(engine, table_name)}"))
+
+
+def drop_retired_tables(engine, table_name):
+    """
+    Drop every table previously swapped out of table_name, including leftovers of earlier runs.
+    """
+    prefix = f"{table_name}{RETIRED_SUFFIX}"
+    for name in inspect(engine).get_table_names():
+        if name.startswith(prefix):
+            try:
+                drop_table(engine, name)
+                print(f"Retired table '{name}' dropped.")
+            except Exception as e:
+                print(f"Failed to drop retired table '{name}': {e}")
+
+
+def drop_retired_tables_in_background(engine, table_name):
+    thread = threading.Thread(target=drop_retired_tables, args=(engine, table_name), daemon=True)
+    thread.start()
+    return thread
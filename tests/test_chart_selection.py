@@ -0,0 +1,57 @@
+from chart_selection import select_visualizations
+
+
+def _column(name, cardinality, null_ratio=0.0, std=1.0):
+    return {"name": name, "cardinality": cardinality, "null_ratio": null_ratio, "std": std}
+
+
+PROFILE = {
+    "rows": 10000,
+    "columns": [
+        _column("amount", 5000),
+        _column("price", 800),
+        _column("constant", 1, std=0.0),
+        _column("region", 6, std=None),
+        _column("user_id", 9000, std=None),
+    ],
+}
+
+
+def _histogram(column):
+    return {"type": "histogram", "all_columns_x": column, "description": f"Histogram of {column}"}
+
+
+def _pie(column):
+    return {"type": "pie", "groupby": column, "description": f"Pie Chart of {column}"}
+
+
+def _reasons(selection):
+    return {pruned["description"]: pruned["reason"] for pruned in selection["pruned"]}
+
+
+def test_uninformative_candidates_are_pruned():
+    candidates = [_histogram("amount"), _histogram("constant"), _pie("region"), _pie("user_id")]
+    selection = select_visualizations(candidates, PROFILE)
+
+    assert [viz["description"] for viz in selection["visualizations"]] == ["Histogram of amount", "Pie Chart of region"]
+    assert _reasons(selection) == {"Histogram of constant": "uninformative", "Pie Chart of user_id": "uninformative"}
+
+
+def test_chart_budget_keeps_the_best_scoring_candidates_in_plan_order():
+    candidates = [_histogram("price"), _pie("region"), _histogram("amount")]
+    selection = select_visualizations(candidates, PROFILE, max_charts=2)
+
+    # The second histogram is discounted as a repeat of the first
+    assert [viz["description"] for viz in selection["visualizations"]] == ["Histogram of price", "Pie Chart of region"]
+    assert _reasons(selection) == {"Histogram of amount": "chart budget"}
+    assert selection["budget"] == {"charts": 2, "cost": 20.0}
+
+
+def test_query_cost_budget_prunes_what_no_longer_fits():
+    candidates = [_histogram("amount"), _pie("region"), {"type": "table", "description": "Table"}]
+    selection = select_visualizations(candidates, PROFILE, max_cost=1.5)
+
+    # Table (0.1) and histogram (1.0) fit; the pie grouped by region costs 1.19 more
+    assert [viz["description"] for viz in selection["visualizations"]] == ["Histogram of amount", "Table"]
+    assert _reasons(selection) == {"Pie Chart of region": "query cost budget"}
+    assert selection["cost"] == 1.1
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+import plan_cache
+import state_store
+import x_ray_feature
+from plan_cache import bucket_key, find_plan, profile_bucket, store_plan
+from profiler import profile_dataframe
+from state_store import init_state
+
+
+@pytest.fixture
+def state_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_store, "STATE_DB_PATH", str(tmp_path / "state.db"))
+    init_state()
+
+
+def _frame(rows, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "amount": rng.normal(size=rows),
+        "region": rng.choice(["north", "south", "east", "west"], rows),
+        "comment": np.where(np.arange(rows) % 4 == 0, None, rng.choice(["ok", "late", "lost"], rows)),
+        "day": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 60, rows), unit="D"),
+    })
+
+
+def test_profiles_in_one_bucket_share_a_key():
+    first = profile_dataframe(_frame(10400, 0), sample_rows=0)
+    second = profile_dataframe(_frame(10300, 1), sample_rows=0)
+    assert bucket_key(profile_bucket(first)) == bucket_key(profile_bucket(second))
+    assert bucket_key(profile_bucket(first)) != bucket_key(profile_bucket(first, settings=[16, 20]))
+
+
+def test_cached_plan_equals_a_fresh_one(state_db, monkeypatch):
+    first = profile_dataframe(_frame(10400, 0), sample_rows=0)
+    second = profile_dataframe(_frame(10300, 1), sample_rows=0)
+    x_ray_feature.plan_dashboard(first)
+    cached = x_ray_feature.plan_dashboard(second)
+
+    monkeypatch.setattr(x_ray_feature, "find_plan", lambda *args: None)
+    fresh = x_ray_feature.plan_dashboard(second)
+    assert cached == fresh
+
+
+def test_storing_a_plan_evicts_other_versions(state_db):
+    store_plan("schema", "bucket", 1, {"visualizations": ["old"]})
+    store_plan("schema", "other bucket", 1, {"visualizations": ["old"]})
+    assert find_plan("schema", "bucket", 1) == {"visualizations": ["old"]}
+
+    store_plan("schema", "bucket", 2, {"visualizations": ["new"]})
+    assert find_plan("schema", "bucket", 1) is None
+    assert find_plan("schema", "other bucket", 1) is None
+    assert find_plan("schema", "bucket", 2) == {"visualizations": ["new"]}
+
+
+def test_least_recently_used_plans_are_evicted(state_db, monkeypatch):
+    monkeypatch.setattr(plan_cache, "PLAN_CACHE_MAX_ENTRIES", 2)
+    store_plan("schema", "a", 1, {"plan": "a"})
+    store_plan("schema", "b", 1, {"plan": "b"})
+    find_plan("schema", "a", 1)
+    store_plan("schema", "c", 1, {"plan": "c"})
+
+    assert find_plan("schema", "a", 1) == {"plan": "a"}
+    assert find_plan("schema", "b", 1) is None
+    assert find_plan("schema", "c", 1) == {"plan": "c"}
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from profiler import ReservoirSample, gee_cardinality, profile_dataframe, wilson_interval
+
+
+def _chunks(rows, chunk_rows):
+    for start in range(0, rows, chunk_rows):
+        yield pd.DataFrame({"id": np.arange(start, min(start + chunk_rows, rows))})
+
+
+def test_reservoir_keeps_size_rows_in_stream_order():
+    reservoir = ReservoirSample(size=1000, seed=0)
+    for chunk in _chunks(50000, 3000):
+        reservoir.add(chunk)
+
+    ids = reservoir.frame()["id"]
+    assert reservoir.rows == 50000
+    assert len(ids) == 1000
+    assert ids.is_unique and ids.is_monotonic_increasing
+    assert ids.min() >= 0 and ids.max() < 50000
+    # Uniform over the stream: every fifth of it holds about a fifth of the sample
+    per_fifth = np.bincount(ids // 10000, minlength=5)
+    assert per_fifth.min() > 150 and per_fifth.max() < 250
+
+
+def test_reservoir_keeps_everything_from_a_short_stream():
+    reservoir = ReservoirSample(size=1000, seed=0)
+    for chunk in _chunks(700, 300):
+        reservoir.add(chunk)
+    assert reservoir.rows == 700
+    assert reservoir.frame()["id"].tolist() == list(range(700))
+
+
+def test_gee_bounds_contain_the_true_cardinality():
+    rng = np.random.default_rng(0)
+    population = 100000
+    for distinct in [3, 50, 101, 5000, 60000, population]:
+        values = rng.integers(0, distinct, population) if distinct < population else np.arange(population)
+        true_cardinality = len(np.unique(values))
+        sample = pd.Series(rng.choice(values, 5000, replace=False))
+        estimate, (low, high) = gee_cardinality(sample.value_counts(), 5000, population)
+        assert low <= true_cardinality <= high
+        assert low <= estimate <= high
+
+
+def test_sampled_profile_bounds_contain_the_exact_values():
+    rng = np.random.default_rng(1)
+    rows = 200000
+    df = pd.DataFrame({
+        "few": rng.choice(list("abcdefgh"), rows),
+        "many": rng.integers(0, 30000, rows),
+        "sparse": np.where(rng.random(rows) < 0.9, np.nan, 1.0),
+    })
+    exact = {column["name"]: column for column in profile_dataframe(df, sample_rows=0)["columns"]}
+    sampled = profile_dataframe(df, sample_rows=20000, seed=0)
+
+    assert not sampled["exact"]
+    for column in sampled["columns"]:
+        low, high = column["cardinality_bounds"]
+        assert low <= exact[column["name"]]["cardinality"] <= high
+        low, high = column["null_ratio_bounds"]
+        assert low <= exact[column["name"]]["null_ratio"] <= high
+
+
+def test_wilson_interval_covers_the_true_ratio():
+    rng = np.random.default_rng(2)
+    population = 50000
+    values = rng.random(population) < 0.3
+    ratio = values.mean()
+    covered = 0
+    for _ in range(200):
+        sample = rng.choice(values, 2000, replace=False)
+        low, high = wilson_interval(int(sample.sum()), 2000, population)
+        covered += low <= ratio <= high
+    # 95% intervals
+    assert covered >= 180
+
+
+def test_wilson_interval_edge_cases():
+    assert wilson_interval(0, 0, 1000) == [0.0, 1.0]
+    low, high = wilson_interval(0, 500, 10000)
+    assert low == 0.0 and 0.0 < high < 0.01
+    low, high = wilson_interval(500, 500, 10000)
+    assert 0.99 < low < 1.0 and high == 1.0
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from db_engine import get_engine
+from profiler import profile_dataframe
+from rollups import (COUNT_SUFFIX, MAX_SUFFIX, ROLLUP_SUFFIX, ROW_COUNT_COLUMN, materialize_rollup, plan_rollups,
+                     rollup_query)
+
+
+def _frame(rows=2000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "cat": rng.choice(list("abcde"), rows),
+        "amount": rng.normal(size=rows).round(3),
+        "price": rng.integers(1, 100, rows).astype(float),
+        "size": rng.integers(1, 50, rows).astype(float),
+        "day": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 10 * 86400, rows), unit="s"),
+    })
+
+
+VISUALIZATIONS = [
+    {
+        "type": "pie",
+        "groupby": "cat",
+        "metric": {"expressionType": "SIMPLE", "column": {"column_name": "cat"}, "aggregate": "COUNT",
+                   "label": "COUNT(cat)"},
+        "adhoc_filters": [{"subject": "day", "operator": "TEMPORAL_RANGE"}],
+    },
+    {
+        "type": "bar",
+        "groupby": "cat",
+        "metric": {"expressionType": "SIMPLE", "column": {"column_name": "amount"}, "aggregate": "SUM",
+                   "label": "SUM(amount)"},
+        "granularity_sqla": "day",
+    },
+    {"type": "line", "metrics": ["count"], "time_column": "day"},
+    {"type": "bubble", "entity": "cat", "x_axis": "amount", "y_axis": "price", "size": "size"},
+    {"type": "histogram", "all_columns_x": "amount"},
+]
+
+
+@pytest.fixture
+def loaded(tmp_path):
+    df = _frame()
+    engine = get_engine(f"sqlite:///{tmp_path / 'rollups.db'}")
+    df.to_sql("sales", engine, index=False)
+    return df, engine
+
+
+def test_plan_rollups_groups_charts_by_grouping():
+    df = _frame()
+    rollups = plan_rollups(VISUALIZATIONS, profile_dataframe(df, sample_rows=0), "sales")
+
+    groupings = {(tuple(rollup["group_by"]), rollup["time_column"]): rollup for rollup in rollups}
+    assert set(groupings) == {(("cat",), "day"), ((), "day"), (("cat",), None)}
+    # The pie and the bar share the (cat, day) rollup; the histogram needs the raw rows
+    assert groupings[("cat",), "day"]["charts"] == [0, 1]
+    assert groupings[("cat",), "day"]["measures"] == {f"cat{COUNT_SUFFIX}": ["COUNT", "cat"],
+                                                      "amount": ["SUM", "amount"]}
+    assert groupings[(), "day"]["measures"] == {ROW_COUNT_COLUMN: ["COUNT", None]}
+    assert groupings[("cat",), None]["measures"] == {"amount": ["SUM", "amount"], "price": ["SUM", "price"],
+                                                     f"size{MAX_SUFFIX}": ["MAX", "size"]}
+    for rollup in rollups:
+        assert rollup["table"].startswith(f"sales{ROLLUP_SUFFIX}")
+        assert rollup["estimated_rows"] <= 5 * 11
+
+
+def test_plan_rollups_skips_rollups_close_to_the_table_size():
+    df = _frame(rows=200)
+    rollups = plan_rollups(VISUALIZATIONS, profile_dataframe(df, sample_rows=0), "sales")
+    # 5 categories x 10 days is more than a tenth of 200 rows
+    assert {(tuple(rollup["group_by"]), rollup["time_column"]) for rollup in rollups} == {((), "day"), (("cat",), None)}
+
+
+def test_rollup_query_truncates_time_to_the_day(loaded):
+    df, engine = loaded
+    rollup = {"group_by": [], "time_column": "day", "measures": {ROW_COUNT_COLUMN: ["COUNT", None]}}
+    query = rollup_query(engine, "sales", rollup)
+    assert query == 'SELECT date(day) AS day, COUNT(*) AS row_count FROM sales GROUP BY date(day)'
+
+    with engine.connect() as conn:
+        rows = dict(conn.execute(text(query)).fetchall())
+    expected = df.groupby(df["day"].dt.strftime("%Y-%m-%d")).size().to_dict()
+    assert rows == expected
+
+
+def test_rollups_reaggregate_to_the_raw_chart_values(loaded):
+    df, engine = loaded
+    rollups = plan_rollups(VISUALIZATIONS, profile_dataframe(df, sample_rows=0), "sales")
+    tables = {(tuple(rollup["group_by"]), rollup["time_column"]): rollup["table"] for rollup in rollups}
+    for rollup in rollups:
+        materialize_rollup(engine, "sales", rollup)
+
+    def query(sql):
+        with engine.connect() as conn:
+            return [tuple(row) for row in conn.execute(text(sql)).fetchall()]
+
+    by_cat = tables[("cat",), "day"]
+    # Pie: COUNT(cat) becomes SUM of the count column; bar: SUM(amount) stays a SUM
+    assert query(f'SELECT cat, SUM("cat{COUNT_SUFFIX}"), ROUND(SUM(amount), 6) FROM "{by_cat}" GROUP BY cat') == \
+        query('SELECT cat, COUNT(cat), ROUND(SUM(amount), 6) FROM sales GROUP BY cat')
+    # Line: COUNT(*) per day becomes SUM of row_count per day
+    by_day = tables[(), "day"]
+    assert query(f'SELECT date(day), SUM({ROW_COUNT_COLUMN}) FROM "{by_day}" GROUP BY date(day)') == \
+        query('SELECT date(day), COUNT(*) FROM sales GROUP BY date(day)')
+    # Bubble: SUM(x), SUM(y) and MAX(size) per entity
+    bubble = tables[("cat",), None]
+    assert query(f'SELECT cat, ROUND(SUM(amount), 6), SUM(price), MAX("size{MAX_SUFFIX}") FROM "{bubble}" '
+                 f'GROUP BY cat') == \
+        query('SELECT cat, ROUND(SUM(amount), 6), SUM(price), MAX(size) FROM sales GROUP BY cat')
@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+import superset_client
+from superset_client import CircuitBreaker, CircuitOpenError, SupersetClient
+
+
+class UnavailableHandler(BaseHTTPRequestHandler):
+    """
+    Answers every request, login included, with 503.
+    """
+
+    def _unavailable(self):
+        self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = do_POST = _unavailable
+
+    def log_message(self, *args):
+        pass
+
+
+class HangingHandler(UnavailableHandler):
+    """
+    Answers every request, login included, only after a long pause.
+    """
+
+    def _hang(self):
+        time.sleep(2)
+        self._unavailable()
+
+    do_GET = do_POST = _hang
+
+
+def _serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+@pytest.fixture
+def unavailable_superset():
+    server, url = _serve(UnavailableHandler)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def hanging_superset():
+    server, url = _serve(HangingHandler)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+def test_failed_login_settles_half_open_trial(unavailable_superset):
+    client = SupersetClient(base_url=unavailable_superset)
+    client.breaker = CircuitBreaker(window=2, min_calls=1, failure_ratio=0.5, reset_seconds=0)
+
+    with pytest.raises(Exception, match="Authentication failed"):
+        client.get("/api/v1/dashboard/1", retries=0)
+    assert client.breaker.state == "open"
+
+    # reset_seconds=0: every call is a half-open trial, and a failed login must reopen the breaker
+    # rather than leave the trial in flight forever
+    for _ in range(3):
+        with pytest.raises(Exception, match="Authentication failed"):
+            client.get("/api/v1/dashboard/1", retries=0)
+        assert client.breaker.state == "open"
+        assert not client.breaker._trial_in_flight
+
+
+def test_breaker_rejects_while_open(unavailable_superset):
+    client = SupersetClient(base_url=unavailable_superset)
+    client.breaker = CircuitBreaker(window=2, min_calls=1, failure_ratio=0.5, reset_seconds=60)
+    with pytest.raises(Exception, match="Authentication failed"):
+        client.get("/api/v1/dashboard/1", retries=0)
+    with pytest.raises(CircuitOpenError):
+        client.get("/api/v1/dashboard/1", retries=0)
+
+
+def test_login_times_out(hanging_superset, monkeypatch):
+    monkeypatch.setattr(superset_client, "SUPERSET_REQUEST_TIMEOUT", 0.2)
+    client = SupersetClient(base_url=hanging_superset)
+    start = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        client.get("/api/v1/dashboard/1", retries=0)
+    assert time.monotonic() - start < 1.5
+
+
+class SlowReadHandler(BaseHTTPRequestHandler):
+    """
+    Logs anyone in; every GET of a dashboard takes 0.3s.
+    """
+
+    def _json(self, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._json({"access_token": "token", "refresh_token": "refresh"})
+
+    def do_GET(self):
+        if "csrf_token" in self.path:
+            self._json({"result": "csrf"})
+            return
+        time.sleep(0.3)
+        self._json({"result": {}})
+
+    def log_message(self, *args):
+        pass
+
+
+def test_concurrent_hedged_reads_are_not_hedged_while_queued():
+    server, url = _serve(SlowReadHandler)
+    try:
+        client = SupersetClient(base_url=url, hedge_reads=True)
+        with ThreadPoolExecutor(max_workers=superset_client.CHART_CONCURRENCY) as executor:
+            responses = list(executor.map(lambda _: client.get("/api/v1/dashboard/1"),
+                                          range(superset_client.CHART_CONCURRENCY)))
+        assert all(response.status_code == 200 for response in responses)
+        # Every read is answered well within the hedge delay once it is actually sent
+        assert client.hedges == 0
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -3,6 +3,7 @@ import os
 import json
 import sqlite3
 import requests
+from superset_client import get_superset_client
 
 app = Flask(__name__)
 
@@ -55,23 +56,7 @@ USERNAME = "admin"
 PASSWORD = "admin"
 
 def authenticate():
-    login_data = {
-        "username": USERNAME,
-        "password": PASSWORD,
-        "provider": "db",
-        "refresh": True
-    }
-    response = requests.post(f"{SUPERSET_BASE_URL}/api/v1/security/login", json=login_data)
-    if response.status_code == 200:
-        access_token = response.json().get("access_token")
-        headers = {"Authorization": f"Bearer {access_token}"}
-        csrf_response = requests.get(f"{SUPERSET_BASE_URL}/api/v1/security/csrf_token/", headers=headers)
-        if csrf_response.status_code == 200:
-            csrf_token = csrf_response.json().get("result")
-            headers["X-CSRFToken"] = csrf_token
-            headers["Content-Type"] = "application/json"
-            return headers
-    raise Exception("Authentication failed")
+    return get_superset_client(SUPERSET_BASE_URL, USERNAME, PASSWORD).headers()
 
 # =========================
 # Search History Endpoints